@@ -1,12 +1,25 @@
 import struct
+import json
 import math
-import bisect
+import heapq
 import os
-import pandas as pd
+import mmap
+import threading
+from secondary import SecondaryIndexes
+from buffer import BufferedFile
+from rwlock import RWLock
+import parallel
+from stats import timed
+from wal import WAL, INSERT, REMOVE, fsync_dir
+from compaction import Compactor
+from codec import open_codec
+from csvrows import read_rows
 
 class Record:
     FORMAT = "i30si20s20s20sf10sb"
     FORMAT_SIZE = struct.calcsize(FORMAT)
+    KEY = struct.Struct("i")
+    ACTIVE_OFFSET = FORMAT_SIZE - 1
 
     def __init__(self, employee_id, employee_name, age, country, 
                  department, position, salary, joining_date, active = True):
@@ -27,158 +40,580 @@ class Record:
         return data
     
     @staticmethod
-    def unpack(data):
-        employee_id, employee_name, age, country, department, position, salary, joining_date, active = struct.unpack(Record.FORMAT, data)
-        return Record(employee_id, employee_name.decode(), age, country.decode(),
-                      department.decode(), position.decode(), salary, joining_date.decode(), active)
+    def unpack(data, offset = 0):
+        employee_id, employee_name, age, country, department, position, salary, joining_date, active = struct.unpack_from(Record.FORMAT, data, offset)
+        return Record(employee_id, employee_name.decode().rstrip('\x00'), age, country.decode().rstrip('\x00'),
+                      department.decode().rstrip('\x00'), position.decode().rstrip('\x00'), salary,
+                      joining_date.decode().rstrip('\x00'), active)
+
+    @staticmethod
+    def key_at(buf, offset = 0):
+        return Record.KEY.unpack(buf[offset:offset + Record.KEY.size])[0]
 
     def __lt__(self, other):
         return self.employee_id < other.employee_id
 
 class SequentialFile:
-    def __init__(self, datafile, auxdata):
+    CHECKPOINT = struct.Struct('<QQQ')
+    # Con compactación en segundo plano el auxiliar puede crecer hasta este múltiplo de log2(n) antes de bloquear
+    AUX_BACKLOG = 16
+
+    def __init__(self, datafile, auxdata, buffer = None, sync = 'flush', stats = None, wal = False, group_commit = 1,
+                 compaction = False, dead_ratio = 0.25, codec = None, cache = None):
         self.datafile = datafile
         self.auxdata = auxdata
-        self.data_sz = self._get_size(self.datafile)
-        self.aux_sz = self._get_size(self.auxdata)
+        self.buffer = buffer
+        self.sync = sync
+        self.stats = stats
+        self.cache = cache
         if not os.path.exists(self.datafile):
             with open(self.datafile, 'wb') as f:
                 f.write(b'')
         if not os.path.exists(self.auxdata):
             with open(self.auxdata, 'wb') as f:
                 f.write(b'')
+        self.codec = open_codec(self.datafile, Record, codec)
+        self.data_file = open(self.datafile, 'r+b')
+        self.aux_file = open(self.auxdata, 'r+b')
+        self._map = None
+        self.data_sz = self._get_size(self.data_file)
+        self.aux_sz = self._get_size(self.aux_file)
+        # Copia inmutable del archivo auxiliar: los lectores la toman sin tocar el handle
+        self.aux_file.seek(0)
+        self.aux = self.aux_file.read()
+        self.secondary = SecondaryIndexes()
+        # Varios lectores y un solo escritor; writer serializa las escrituras completas
+        self.lock = RWLock()
+        self.writer = threading.RLock()
+        self._map_lock = threading.Lock()
+        self.dead_ratio = dead_ratio
+        self.dead = 0
+        # Claves eliminadas mientras un rebuild mezcla sin el lock de escritura; None si no hay mezcla en curso
+        self.removed = None
+        self.merged = threading.Condition(self.writer)
+        self.compactor = None
+        self.wal = None
+        if wal:
+            self.wal = WAL(self.datafile + '.wal', group_commit)
+            self._recover()
+        if compaction:
+            # Solo el compactador usa la cuenta de eliminados
+            self.dead = self._count_dead()
+            self.compactor = Compactor(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @timed('import_from_csv')
+    def import_from_csv(self, file, sep = ',', chunksize = 50000):
+        encode_row = self.codec.encode_row
+        with self.writer:
+            # Reemplaza el archivo completo: un rebuild en curso se descarta al terminar su mezcla
+            self._end_merge()
+            if self.wal:
+                self.checkpoint()
+            rows = []
+            self.flush()
+            self.data_file.seek(0)
+            existing = self.data_file.read()
+            for pos in range(0, len(existing) - self.codec.size + 1, self.codec.size):
+                data = existing[pos:pos + self.codec.size]
+                if data[self.codec.active_offset]:
+                    rows.append((Record.KEY.unpack_from(data)[0], data))
+            rows.extend(self._read_aux(self.aux))
+            existing_count = len(rows)
+
+            rows.extend((row[0], encode_row(*row)) for row in read_rows(file, sep, chunksize))
+
+            if self.secondary:
+                for _, data in rows[existing_count:]:
+                    self.secondary.add(self.codec.decode(data))
+            rows.sort(key=lambda row: row[0])
+            tmpfile, count = self._write_main(rows)
+            if self.stats:
+                self.stats.add('records_written', count)
+            self._install_main(tmpfile, count)
+            if self.cache:
+                self.cache.clear()
+
+    def _invalidate(self):
+        self._map = None
+        if self.buffer:
+            self.buffer.invalidate(self.datafile)
+
+    def _sync(self, f):
+        if self.sync == 'none':
+            return
+        f.flush()
+        if self.sync == 'fsync':
+            os.fsync(f.fileno())
+
+    def _recover(self):
+        # Al abrir: el auxiliar vuelve a su largo del checkpoint y se reaplican las operaciones del log
+        checkpoint, entries = self.wal.replay()
+        if checkpoint is not None:
+            ino, size, aux_len = self.CHECKPOINT.unpack(checkpoint)
+            st = os.fstat(self.data_file.fileno())
+            if (st.st_ino, st.st_size) != (ino, size):
+                # Un rebuild alcanzó a reemplazar el archivo principal: ya incluye el auxiliar del checkpoint,
+                # y el log solo tiene las operaciones que llegaron durante la mezcla
+                aux_len = 0
+            self.aux_file.truncate(aux_len)
+            self.aux_file.seek(0)
+            self.aux = self.aux_file.read()
+            self.aux_sz = len(self.aux) // self.codec.size
+            for op, payload in entries:
+                if op == INSERT:
+                    self._append_aux(self.codec.encode(Record(**json.loads(payload))))
+                elif op == REMOVE:
+                    self._remove(Record.KEY.unpack(payload)[0])
+        self.checkpoint()
+
+    def checkpoint(self):
+        with self.writer:
+            self.flush()
+            if self.removed is not None:
+                # Durante una mezcla el log debe conservar todo lo posterior a su instantánea
+                return
+            self.codec.flush(True)
+            for f in (self.data_file, self.aux_file):
+                os.fsync(f.fileno())
+            fsync_dir(self.datafile)
+            st = os.fstat(self.data_file.fileno())
+            self.wal.checkpoint(self.CHECKPOINT.pack(st.st_ino, st.st_size, len(self.aux)))
+
+    def _maybe_checkpoint(self):
+        if self.wal and self.wal.size() > self.wal.checkpoint_bytes:
+            self.checkpoint()
+
+    def flush(self):
+        with self.writer:
+            if self.wal:
+                self.wal.commit()
+            if self.buffer:
+                self.buffer.flush(self.datafile)
+            self.codec.flush(self.sync == 'fsync')
+            if isinstance(self._map, mmap.mmap):
+                self._map.flush()
+            for f in (self.data_file, self.aux_file):
+                f.flush()
+                if self.sync == 'fsync':
+                    os.fsync(f.fileno())
+
+    def close(self):
+        if self.compactor:
+            self.compactor.stop()
+            self.compactor = None
+        with self.writer:
+            if self.data_file.closed:
+                return
+            if self.wal:
+                if self.wal.dirty:
+                    self.checkpoint()
+                self.wal.close()
+            self.flush()
+            if isinstance(self._map, mmap.mmap):
+                self._map.close()
+            self._map = None
+            self.data_file.close()
+            self.aux_file.close()
+            self.codec.close()
+
+    def _get_size(self, f):
+        f.seek(0, 2)
+        return f.tell() // self.codec.size
+
+    def _main(self):
+        if self.buffer:
+            return BufferedFile(self.buffer, self.datafile)
+        buf = self._map
+        if buf is None:
+            with self._map_lock:
+                if self._map is None:
+                    size = os.fstat(self.data_file.fileno()).st_size
+                    self._map = mmap.mmap(self.data_file.fileno(), 0) if size else b''
+                buf = self._map
+        return buf
+
+    def _count_dead(self):
+        # Se lee el archivo directamente: recorrerlo con el buffer desalojaría sus páginas
+        if self.buffer:
+            self.buffer.flush(self.datafile)
+        dead = self.aux[self.codec.active_offset::self.codec.size].count(0)
+        if os.fstat(self.data_file.fileno()).st_size:
+            with mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                dead += buf[self.codec.active_offset::self.codec.size].count(0)
+        return dead
+
+    def needs_compaction(self):
+        total = self.data_sz + self.aux_sz
+        if not total:
+            return False
+        return self.dead >= self.dead_ratio * total or self._aux_full()
+
+    def _aux_full(self):
+        return self.data_sz == 0 or self.aux_sz > math.log2(self.data_sz)
+
+    def _log_record(self, record):
+        # El log guarda los campos y no la fila codificada: no depende del heap de nombres
+        return json.dumps(vars(record)).encode()
+
+    def _merge_if_needed(self):
+        # Con compactador, el merge se delega al hilo salvo que el auxiliar se haya atrasado demasiado
+        if self._aux_full():
+            if self.compactor and self.data_sz and self.aux_sz <= self.AUX_BACKLOG * math.log2(self.data_sz):
+                self.compactor.notify()
+            elif self.removed is not None:
+                # El compactador ya está mezclando: se espera a que termine en vez de repetir la mezcla
+                removed = self.removed
+                self.merged.wait_for(lambda: self.removed is not removed)
+            else:
+                self.rebuild()
+                return
+        self._maybe_checkpoint()
 
-    def import_from_csv(self, file, sep = ','):
-        data = pd.read_csv(file, sep=sep)
-        data = data.sort_values(by='Employee_ID', ascending=True)
-        for _, row in data.iterrows():
-            record = Record(employee_id=row['Employee_ID'], employee_name=row['Employee_Name'],
-                            age=row['Age'], country=row['Country'], department=row['Department'],
-                            position=row['Position'], salary=row['Salary'],
-                            joining_date=row['Joining_Date'])
-            with open(self.datafile, 'ab') as f:
-                f.write(record.pack())
-
-    def _get_size(self, file):
-        with open(file, 'rb') as f:
-            f.seek(0, 2)
-            return f.tell() // Record.FORMAT_SIZE
+    def _snapshot(self):
+        with self.lock.read():
+            if self.buffer:
+                # BufferedFile sigue la ruta y tras un rebuild leería el archivo nuevo: se fija el actual con un mmap
+                self.buffer.flush(self.datafile)
+                size = os.fstat(self.data_file.fileno()).st_size
+                return ((mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''), self.aux,
+                        self.codec.reader())
+            return self._main(), self.aux, self.codec.reader()
 
+    def _append_aux(self, data):
+        self.aux_file.seek(0, 2)
+        self.aux_file.write(data)
+        self._sync(self.aux_file)
+        if self.stats:
+            self.stats.add('records_written', len(data) // self.codec.size)
+        with self.lock.write():
+            self.aux += data
+            self.aux_sz += len(data) // self.codec.size
+
+    @timed('insert')
     def insert(self, record):
-        if self.data_sz == 0:
-            with open(self.datafile, 'ab') as f:
-                f.write(record.pack())
-            self.data_sz += 1
+        with self.writer:
+            data = self.codec.encode(record)
+            if self.secondary:
+                self.secondary.add(self.codec.decode(data))
+            if self.wal:
+                self.wal.append(INSERT, self._log_record(record))
+            self._append_aux(data)
+            if self.cache:
+                self.cache.invalidate([record.employee_id])
+            self._merge_if_needed()
+
+    @timed('insert_many')
+    def insert_many(self, records):
+        records = list(records)
+        if not records:
             return
+        with self.writer:
+            data = b''.join(self.codec.encode(record) for record in records)
+            if self.secondary:
+                for pos in range(0, len(data), self.codec.size):
+                    self.secondary.add(self.codec.decode(data, pos))
+            if self.wal:
+                # Un solo commit del log para todo el lote
+                self.wal.append_many(INSERT, [self._log_record(record) for record in records])
+                self.wal.commit()
+            self._append_aux(data)
+            if self.cache:
+                self.cache.invalidate(record.employee_id for record in records)
+            # Un solo merge al final del lote, si el lote dejó al auxiliar sobre el límite de siempre
+            self._merge_if_needed()
+
+    def _read_aux(self, buf, init_key = float('-inf'), end_key = float('inf')):
+        # Solo se copian y ordenan las filas vivas dentro del rango
+        if self.stats:
+            self.stats.add('records_read', len(buf) // self.codec.size)
+        rows = []
+        for pos in range(0, len(buf) - self.codec.size + 1, self.codec.size):
+            if buf[pos + self.codec.active_offset]:
+                key = Record.KEY.unpack_from(buf, pos)[0]
+                if init_key <= key <= end_key:
+                    rows.append((key, buf[pos:pos + self.codec.size]))
+        rows.sort(key=lambda row: row[0])
+        return rows
 
-        if self.data_sz > 0 and self.aux_sz <= math.log2(self.data_sz):
-            with open(self.auxdata, 'ab') as f:
-                f.write(record.pack())
-            self.data_sz += 1
-        else:
-            with open(self.auxdata, 'ab') as f:
-                f.write(record.pack())
-            self.aux_sz += 1
-            self.rebuild()
+    def _iter_main_rows(self, buf):
+        for pos in range(0, len(buf) - self.codec.size + 1, self.codec.size):
+            if buf[pos + self.codec.active_offset]:
+                yield Record.key_at(buf, pos), buf[pos:pos + self.codec.size]
 
+    def _write_main(self, rows):
+        # El archivo nuevo se escribe aparte sin bloquear a los lectores
+        count = 0
+        tmpfile = f'{self.datafile}.{threading.get_ident()}.tmp'
+        with open(tmpfile, 'wb') as f:
+            for _, data in rows:
+                f.write(data)
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        return tmpfile, count
+
+    def _swap_main(self, tmpfile):
+        # Se llama con el lock exclusivo; los mmap que tengan los lectores siguen siendo válidos
+        os.replace(tmpfile, self.datafile)
+        self.data_file.close()
+        self.data_file = open(self.datafile, 'r+b')
+        self._invalidate()
+
+    @timed('rebuild')
     def rebuild(self):
-        aux_data = []
-        with open(self.auxdata, 'rb') as f:
-            while True:
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                if data.active:
-                    aux_data.append(Record.unpack(data))
-
-        data = []
-        with open(self.datafile, 'rb') as f:
-            while True:
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                aux_data.append(Record.unpack(data))
-
-        for record in aux_data:
-            bisect.insort(data, record)
-
-        with open(self.datafile, 'wb') as f:
-            for record in data:
-                f.write(record.pack())
-
-        self.aux_sz = 0
-        self.data_sz += len(aux_data)
+        # La mezcla corre sin el lock de escritura: las inserciones siguen llegando al auxiliar y las
+        # eliminaciones se anotan para reaplicarlas sobre el archivo nuevo antes del intercambio
+        with self.writer:
+            self._end_merge()
+            if self.wal:
+                self.checkpoint()
+            buf, aux, _ = self._snapshot()
+            # Con el formato compacto los nombres de las filas vivas se copian a un heap nuevo
+            rewrite = self.codec.rewrite()
+            removed = self.removed = []
+        try:
+            rows = heapq.merge(self._iter_main_rows(buf), self._read_aux(aux), key=lambda row: row[0])
+            if rewrite is not None:
+                rows = ((key, rewrite.relocate(data)) for key, data in rows)
+            tmpfile, count = self._write_main(rows)
+        except BaseException:
+            if rewrite is not None:
+                rewrite.cancel()
+            with self.writer:
+                if self.removed is removed:
+                    self._end_merge()
+            raise
+        with self.writer:
+            if self.removed is not removed:
+                # Otro rebuild o un import reemplazó el archivo mientras se mezclaba
+                os.remove(tmpfile)
+                if rewrite is not None:
+                    rewrite.cancel()
+                return
+            self._end_merge()
+            dead = self._apply_removed(tmpfile, removed)
+            if self.stats:
+                self.stats.add('records_read', len(buf) // self.codec.size)
+                self.stats.add('records_written', count)
+            self._install_main(tmpfile, count, self.aux[len(aux):], dead, rewrite)
+
+    def _end_merge(self):
+        self.removed = None
+        self.merged.notify_all()
 
+    def _apply_removed(self, tmpfile, keys):
+        dead = 0
+        if not keys or not os.path.getsize(tmpfile):
+            return dead
+        with open(tmpfile, 'r+b') as f, mmap.mmap(f.fileno(), 0) as buf:
+            for key in set(keys):
+                pos = self._lower_bound(buf, key) * self.codec.size
+                while pos + self.codec.size <= len(buf) and Record.key_at(buf, pos) == key:
+                    if buf[pos + self.codec.active_offset]:
+                        buf[pos + self.codec.active_offset] = 0
+                        dead += 1
+                    pos += self.codec.size
+            buf.flush()
+        return dead
+
+    def _install_main(self, tmpfile, count, tail = b'', dead = 0, rewrite = None):
+        # El archivo nuevo ya contiene al auxiliar de la instantánea; las filas vivas que llegaron durante la mezcla
+        # pasan al auxiliar nuevo. Con WAL el intercambio cierra el log con un checkpoint
+        rows = [tail[pos:pos + self.codec.size] for pos in range(0, len(tail), self.codec.size)
+                if tail[pos + self.codec.active_offset]]
+        if rewrite is not None:
+            rows = [rewrite.relocate(row) for row in rows]
+        tail = b''.join(rows)
+        with self.lock.write():
+            if rewrite is not None:
+                # El heap nuevo reemplaza al anterior junto con el archivo principal
+                rewrite.commit(tmpfile, self._swap_main)
+            else:
+                self._swap_main(tmpfile)
+            self.data_sz = count
+            self.aux_file.seek(0)
+            self.aux_file.truncate()
+            self.aux_file.write(tail)
+            self._sync(self.aux_file)
+            self.aux = tail
+            self.aux_sz = len(tail) // self.codec.size
+            self.dead = dead
+        if self.wal:
+            self.checkpoint()
+
+    def _lower_bound(self, buf, key):
+        left, right = 0, len(buf) // self.codec.size
+        steps = 0
+        while left < right:
+            mid = (left + right) // 2
+            steps += 1
+            if Record.key_at(buf, mid * self.codec.size) < key:
+                left = mid + 1
+            else:
+                right = mid
+        if self.stats:
+            self.stats.add('comparisons', steps)
+        return left
+
+    def _upper_bound(self, buf, key):
+        left, right = 0, len(buf) // self.codec.size
+        steps = 0
+        while left < right:
+            mid = (left + right) // 2
+            steps += 1
+            if Record.key_at(buf, mid * self.codec.size) <= key:
+                left = mid + 1
+            else:
+                right = mid
+        if self.stats:
+            self.stats.add('comparisons', steps)
+        return left
+
+    @timed('search')
     def search(self, key):
-        with open(self.datafile, 'rb') as f:
-            while True:
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                record = Record.unpack(data)
-                if record.employee_id == key:
-                    return record
-        
-        with open(self.auxdata, 'rb') as f:
-            while True:
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                record = Record.unpack(data)
-                if record.employee_id == key:
-                    return record
+        if self.cache:
+            return self.cache.get_or_compute(('point', key), lambda: self._search(key), self.stats)
+        return self._search(key)
+
+    def _search(self, key):
+        with self.lock.read():
+            buf = self._main()
+            pos = self._lower_bound(buf, key) * self.codec.size
+            while pos + self.codec.size <= len(buf) and Record.key_at(buf, pos) == key:
+                if self.stats:
+                    self.stats.add('records_read')
+                if buf[pos + self.codec.active_offset]:
+                    if self.stats:
+                        self.stats.add('unpacks')
+                    return self.codec.decode(buf[pos:pos + self.codec.size])
+                pos += self.codec.size
+            aux, decode = self.aux, self.codec.reader()
+
+        # Recorrido directo del auxiliar: solo se decodifica la fila que coincide
+        unpack_from = Record.KEY.unpack_from
+        for pos in range(0, len(aux) - self.codec.size + 1, self.codec.size):
+            if unpack_from(aux, pos)[0] == key and aux[pos + self.codec.active_offset]:
+                if self.stats:
+                    self.stats.add('records_read', pos // self.codec.size + 1)
+                    self.stats.add('comparisons', pos // self.codec.size + 1)
+                    self.stats.add('unpacks')
+                return decode(aux, pos)
+        if self.stats:
+            self.stats.add('records_read', len(aux) // self.codec.size)
+            self.stats.add('comparisons', len(aux) // self.codec.size)
         return None
 
+    @timed('remove')
     def remove(self, key):
-        with open(self.datafile, 'rb+') as f:
-            while True:
-                pos = f.tell()
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                record = Record.unpack(data)
-                if record.employee_id == key and record.active:
-                    record.active = False
-                    f.seek(pos)
-                    f.write(record.pack())
-                    self.data_sz -= 1
-
-        with open(self.auxdata, 'rb+') as f:
-            while True:
-                pos = f.tell()
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                record = Record.unpack(data)
-                if record.employee_id == key and record.active:
-                    record.active = False
-                    f.seek(pos)
-                    f.write(record.pack())
-                    self.aux_sz -= 1
-                    return
-                record = Record.unpack(data)
-                if record.employee_id == key:
-                    record.active = False
-                    self.aux_sz -= 1
+        with self.writer:
+            if self.secondary:
+                record = self.search(key)
+                if record:
+                    self.secondary.discard(record)
+            if self.wal:
+                self.wal.append(REMOVE, Record.KEY.pack(key))
+            self._remove(key)
+            if self.cache:
+                self.cache.invalidate([key])
+            if self.compactor and self.needs_compaction():
+                self.compactor.notify()
+            self._maybe_checkpoint()
+
+    def _remove(self, key):
+        aux = bytearray(self.aux)
+        for pos in range(0, len(aux) - self.codec.size + 1, self.codec.size):
+            if Record.KEY.unpack_from(aux, pos)[0] == key:
+                if aux[pos + self.codec.active_offset]:
+                    self.dead += 1
+                aux[pos + self.codec.active_offset] = 0
+                self.aux_file.seek(pos + self.codec.active_offset)
+                self.aux_file.write(b'\x00')
+                if self.stats:
+                    self.stats.add('records_written')
+        self._sync(self.aux_file)
+        if self.removed is not None:
+            self.removed.append(key)
+
+        with self.lock.write():
+            buf = self._main()
+            pos = self._lower_bound(buf, key) * self.codec.size
+            while pos + self.codec.size <= len(buf) and Record.key_at(buf, pos) == key:
+                if buf[pos + self.codec.active_offset]:
+                    self.dead += 1
+                buf[pos + self.codec.active_offset] = 0
+                pos += self.codec.size
+                if self.stats:
+                    self.stats.add('records_written')
+            if self.sync == 'fsync' and isinstance(buf, mmap.mmap):
+                buf.flush()
+            self.aux = bytes(aux)
+
+    def _iter_main(self, buf, init_key, end_key, decode):
+        pos = self._lower_bound(buf, init_key) * self.codec.size
+        while pos + self.codec.size <= len(buf):
+            if self.stats:
+                self.stats.add('records_read')
+                self.stats.add('comparisons')
+            if Record.key_at(buf, pos) > end_key:
+                break
+            if buf[pos + self.codec.active_offset]:
+                if self.stats:
+                    self.stats.add('unpacks')
+                yield decode(buf[pos:pos + self.codec.size])
+            pos += self.codec.size
+
+    def _iter_range(self, buf, aux, init_key, end_key, decode):
+        aux_results = [decode(data) for _, data in self._read_aux(aux, init_key, end_key)]
+        if self.stats:
+            self.stats.add('unpacks', len(aux_results))
+        yield from heapq.merge(self._iter_main(buf, init_key, end_key, decode), aux_results)
+
+    def iter_range(self, init_key, end_key):
+        # Recorre una instantánea: un rebuild concurrente no altera los resultados
+        buf, aux, decode = self._snapshot()
+        yield from self._iter_range(buf, aux, init_key, end_key, decode)
 
+    @timed('range_search')
     def range_search(self, init_key, end_key):
-        results = []
-
-        with open(self.datafile, 'rb') as f:
-            while True:
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                record = Record.unpack(data)
-                if init_key <= record.employee_id <= end_key and record.active:
-                    results.append(record)
-
-        with open(self.auxdata, 'rb') as f:
-            while True:
-                data = f.read(Record.FORMAT_SIZE)
-                if not data:
-                    break
-                record = Record.unpack(data)
-                if init_key <= record.employee_id <= end_key and record.active:
-                    results.append(record)
-        return results
\ No newline at end of file
+        if self.cache:
+            return list(self.cache.get_or_compute(('range', init_key, end_key),
+                                                  lambda: self._range_search(init_key, end_key), self.stats))
+        return self._range_search(init_key, end_key)
+
+    def _range_search(self, init_key, end_key):
+        with self.lock.read():
+            buf, aux = self._main(), self.aux
+            return list(self._iter_range(buf, aux, init_key, end_key, self.codec.decode))
+
+    @timed('parallel_range_search')
+    def parallel_range_search(self, init_key, end_key, executor = None, workers = None):
+        if self.codec.name != 'fixed':
+            return self.range_search(init_key, end_key)
+        # Los procesos leen el archivo desde disco: el buffer debe estar escrito antes
+        with self.lock.read():
+            if self.buffer:
+                self.buffer.flush(self.datafile)
+            buf, aux = self._main(), self.aux
+            start = self._lower_bound(buf, init_key) * self.codec.size
+            stop = self._upper_bound(buf, end_key) * self.codec.size
+            rows = parallel.scan_range(self.datafile, Record.FORMAT, start, stop, True, executor, workers)
+        aux_results = [self.codec.decode(data) for _, data in self._read_aux(aux, init_key, end_key)]
+        if self.stats:
+            self.stats.add('records_read', (stop - start) // self.codec.size)
+            self.stats.add('unpacks', len(rows) + len(aux_results))
+        return list(heapq.merge((Record(*fields) for fields in rows), aux_results))
+
+    def create_index(self, field):
+        self.secondary.create(field, self.iter_range(float('-inf'), float('inf')))
+
+    def find_by(self, field, value):
+        return [self.search(key) for key in self.secondary.find(field, value)]
+
+    def range_by(self, field, low, high):
+        return [self.search(key) for key in self.secondary.range(field, low, high)]
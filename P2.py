@@ -1,5 +1,14 @@
 import struct
-import pandas as pd
+import os
+import json
+import heapq
+import threading
+from secondary import SecondaryIndexes
+import parallel
+from stats import timed
+from wal import WAL, INSERT, REMOVE, BULK
+from csvrows import read_rows
+from codec import open_codec
 
 class Record:
     FORMAT = "i30si20s20s20sf10s"
@@ -29,8 +38,8 @@ class Record:
                            self.joining_date.encode().ljust(10, b'\x00'))
 
     @staticmethod
-    def unpack(data):
-        fields = struct.unpack(Record.FORMAT, data)
+    def unpack(data, offset=0):
+        fields = struct.unpack_from(Record.FORMAT, data, offset)
         return Record(fields[0],
                       fields[1].decode().strip('\x00'),
                       fields[2],
@@ -42,155 +51,518 @@ class Record:
                       True)
 
 class Node:
-    def __init__(self, record):
-        self.record = record
-        self.left = None
-        self.right = None
-        self.height = 1
+    __slots__ = ("pos", "key", "record_pos", "left", "right", "height")
+    FORMAT = "iiiii"
+    FORMAT_SIZE = struct.calcsize(FORMAT)
+
+    def __init__(self, pos, key, record_pos, left=-1, right=-1, height=1):
+        self.pos = pos
+        self.key = key
+        self.record_pos = record_pos
+        self.left = left
+        self.right = right
+        self.height = height
+
+    def pack(self):
+        return struct.pack(self.FORMAT, self.key, self.record_pos, self.left, self.right, self.height)
+
+    @staticmethod
+    def unpack(pos, data, offset=0):
+        key, record_pos, left, right, height = struct.unpack_from(Node.FORMAT, data, offset)
+        return Node(pos, key, record_pos, left, right, height)
 
 class AVL:
-    def __init__(self, datafile):
-        self.root = None
+    HEADER_FORMAT = "i"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+    def __init__(self, datafile, indexfile=None, buffer=None, sync="flush", stats=None, wal=False, group_commit=1,
+                 cache=None, codec=None):
         self.datafile = datafile
+        self.indexfile = indexfile if indexfile else datafile + ".idx"
+        self.buffer = buffer
+        self.sync = sync
+        self.stats = stats
+        self.cache = cache
+        self.root = -1
+        self.secondary = SecondaryIndexes()
+        if not os.path.exists(self.datafile):
+            with open(self.datafile, "wb") as f:
+                f.write(b"")
+        self.codec = open_codec(self.datafile, Record, codec)
+        # Sin buffer de Python: las lecturas usan os.pread y ven cada escritura sin compartir la posición del handle.
+        # Donde no hay os.pread (Windows) seek y read/write van juntos bajo seek_lock
+        self.data_file = open(self.datafile, "r+b", buffering=0)
+        self.seek_lock = threading.Lock()
+        if os.path.exists(self.indexfile):
+            self.index_file = open(self.indexfile, "r+b", buffering=0)
+            self.root = struct.unpack(self.HEADER_FORMAT, self.index_file.read(self.HEADER_SIZE))[0]
+        else:
+            self.index_file = open(self.indexfile, "w+b", buffering=0)
+            self.index_file.write(struct.pack(self.HEADER_FORMAT, self.root))
+            self.index_file.flush()
+            self._invalidate()
+            self._index_datafile()
+        self.wal = None
+        if wal:
+            self.wal = WAL(self.datafile + ".wal", group_commit)
+            self._recover()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _index_datafile(self):
+        # Construir el índice una sola vez a partir de un datafile sin índice
+        self.data_file.seek(0)
+        data = self.data_file.read()
+        for record_pos, offset in enumerate(range(0, len(data) - self.codec.size + 1, self.codec.size)):
+            self.insert(self.index_file, struct.unpack_from("i", data, offset)[0], record_pos)
+        self._write_root(self.index_file)
+        self._sync()
+
+    def _invalidate(self):
+        if self.buffer:
+            self.buffer.invalidate(self.indexfile)
+
+    def _sync(self):
+        if self.sync == "none":
+            return
+        for f in (self.index_file, self.data_file):
+            f.flush()
+            if self.sync == "fsync":
+                os.fsync(f.fileno())
+
+    def _recover(self):
+        # Si el log tiene operaciones después del checkpoint el índice puede estar a medio escribir:
+        # se reconstruye desde el checkpoint y se reaplican las operaciones
+        checkpoint, entries = self.wal.replay()
+        if checkpoint is not None and entries:
+            data_len = struct.unpack_from("<Q", checkpoint)[0]
+            pairs = struct.unpack_from(f"{(len(checkpoint) - 8) // 4}i", checkpoint, 8)
+            self.data_file.truncate(data_len)
+            self._build(list(zip(pairs[::2], pairs[1::2])))
+            for op, payload in entries:
+                if op == INSERT:
+                    record = Record(**json.loads(payload))
+                    if self.search(self.index_file, record.employee_id) == -1:
+                        self._insert_packed(record.employee_id, self.codec.encode(record))
+                elif op == REMOVE:
+                    self._remove_key(struct.unpack("i", payload)[0])
+        elif checkpoint is not None:
+            return
+        self.checkpoint()
 
-    def get_height(self, node):
-        return node.height if node else 0
-
-    def get_balance(self, node):
-        return self.get_height(node.left) - self.get_height(node.right) if node else 0
-
-    def rotate_right(self, y):
-        x = y.left
-        T2 = x.right
-        x.right = y
-        y.left = T2
-        y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
-        x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
-        return x
-
-    def rotate_left(self, x):
-        y = x.right
-        T2 = y.left
-        y.left = x
-        x.right = T2
-        x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
-        y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
-        return y
-
-    def insert(self, node, record):
-        if not node:
-            return Node(record)
-        if record.employee_id < node.record.employee_id:
-            node.left = self.insert(node.left, record)
-        elif record.employee_id > node.record.employee_id:
-            node.right = self.insert(node.right, record)
+    def checkpoint(self):
+        # Guarda las parejas (clave, posición) en orden y el largo del datafile; O(n)
+        self.flush()
+        self.codec.flush(True)
+        for f in (self.index_file, self.data_file):
+            os.fsync(f.fileno())
+        pairs = [value for node in self._iter_nodes(self.index_file, float("-inf"), float("inf"))
+                 for value in (node.key, node.record_pos)]
+        data_len = os.fstat(self.data_file.fileno()).st_size
+        self.wal.checkpoint(struct.pack("<Q", data_len) + struct.pack(f"{len(pairs)}i", *pairs))
+
+    def _maybe_checkpoint(self):
+        if self.wal and self.wal.size() > self.wal.checkpoint_bytes:
+            self.checkpoint()
+
+    def flush(self):
+        if self.wal:
+            self.wal.commit()
+        if self.buffer:
+            self.buffer.flush(self.indexfile)
+        self.codec.flush(self.sync == "fsync")
+        for f in (self.index_file, self.data_file):
+            f.flush()
+            if self.sync == "fsync":
+                os.fsync(f.fileno())
+
+    def close(self):
+        if self.index_file.closed:
+            return
+        if self.wal:
+            if self.wal.dirty:
+                self.checkpoint()
+            self.wal.close()
+        self.flush()
+        self.index_file.close()
+        self.data_file.close()
+        self.codec.close()
+
+    def _read(self, f, offset, size):
+        if self.buffer:
+            return self.buffer.read(self.indexfile, offset, size)
+        return self._pread(f, offset, size)
+
+    def _pread(self, f, offset, size):
+        if hasattr(os, "pread"):
+            return os.pread(f.fileno(), size, offset)
+        with self.seek_lock:
+            f.seek(offset)
+            return f.read(size)
+
+    def _data_len(self):
+        return os.fstat(self.data_file.fileno()).st_size // self.codec.size
+
+    def _write_data(self, record_pos, data):
+        # Los lectores sin os.pread también mueven la posición del handle
+        with self.seek_lock:
+            self.data_file.seek(record_pos * self.codec.size)
+            self.data_file.write(data)
+
+    def _write(self, f, offset, data):
+        if self.buffer:
+            self.buffer.write(self.indexfile, offset, data)
+        else:
+            f.seek(offset)
+            f.write(data)
+
+    def _write_root(self, f):
+        self._write(f, 0, struct.pack(self.HEADER_FORMAT, self.root))
+
+    def _read_node(self, f, pos):
+        if pos == -1:
+            return None
+        if self.stats:
+            self.stats.add("nodes_read")
+        return Node.unpack(pos, self._read(f, self.HEADER_SIZE + pos * Node.FORMAT_SIZE, Node.FORMAT_SIZE))
+
+    def _write_node(self, f, node):
+        if self.stats:
+            self.stats.add("nodes_written")
+        self._write(f, self.HEADER_SIZE + node.pos * Node.FORMAT_SIZE, node.pack())
+
+    def _new_node(self, f, key, record_pos):
+        if self.buffer:
+            size = self.buffer.size(self.indexfile)
         else:
-            return node
+            f.seek(0, 2)
+            size = f.tell()
+        node = Node((size - self.HEADER_SIZE) // Node.FORMAT_SIZE, key, record_pos)
+        self._write_node(f, node)
+        return node.pos
+
+    def _read_record(self, record_pos):
+        if self.stats:
+            self.stats.add("records_read")
+            self.stats.add("unpacks")
+        return self.codec.decode(self._pread(self.data_file, record_pos * self.codec.size, self.codec.size))
 
-        node.height = 1 + max(self.get_height(node.left), self.get_height(node.right))
-        balance = self.get_balance(node)
+    def read_records(self, positions):
+        # Las posiciones que devuelve range_search siguen siendo válidas: el datafile solo crece
+        return [self._read_record(record_pos) for record_pos in positions]
 
-        if balance > 1 and record.employee_id < node.left.record.employee_id:
-            return self.rotate_right(node)
-        if balance < -1 and record.employee_id > node.right.record.employee_id:
-            return self.rotate_left(node)
-        if balance > 1 and record.employee_id > node.left.record.employee_id:
-            node.left = self.rotate_left(node.left)
-            return self.rotate_right(node)
-        if balance < -1 and record.employee_id < node.right.record.employee_id:
-            node.right = self.rotate_right(node.right)
-            return self.rotate_left(node)
+    def get_height(self, f, pos):
+        return self._read_node(f, pos).height if pos != -1 else 0
 
-        return node
+    def get_balance(self, f, node):
+        return self.get_height(f, node.left) - self.get_height(f, node.right) if node else 0
 
+    def rotate_right(self, f, y):
+        if self.stats:
+            self.stats.add("rotations")
+        x = self._read_node(f, y.left)
+        y.left = x.right
+        x.right = y.pos
+        y.height = 1 + max(self.get_height(f, y.left), self.get_height(f, y.right))
+        x.height = 1 + max(self.get_height(f, x.left), y.height)
+        self._write_node(f, y)
+        self._write_node(f, x)
+        return x.pos
+
+    def rotate_left(self, f, x):
+        if self.stats:
+            self.stats.add("rotations")
+        y = self._read_node(f, x.right)
+        x.right = y.left
+        y.left = x.pos
+        x.height = 1 + max(self.get_height(f, x.left), self.get_height(f, x.right))
+        y.height = 1 + max(x.height, self.get_height(f, y.right))
+        self._write_node(f, x)
+        self._write_node(f, y)
+        return y.pos
+
+    def rebalance(self, f, node):
+        node.height = 1 + max(self.get_height(f, node.left), self.get_height(f, node.right))
+        balance = self.get_balance(f, node)
+
+        if balance > 1:
+            if self.get_balance(f, self._read_node(f, node.left)) < 0:
+                node.left = self.rotate_left(f, self._read_node(f, node.left))
+            return self.rotate_right(f, node)
+        if balance < -1:
+            if self.get_balance(f, self._read_node(f, node.right)) > 0:
+                node.right = self.rotate_right(f, self._read_node(f, node.right))
+            return self.rotate_left(f, node)
+
+        self._write_node(f, node)
+        return node.pos
+
+    def _retrace(self, f, path, child):
+        while path:
+            node, went_left = path.pop()
+            height = node.height
+            if went_left:
+                node.left = child
+            else:
+                node.right = child
+            child = self.rebalance(f, node)
+            if child == node.pos and node.height == height:
+                return
+        self.root = child
+
+    def insert(self, f, key, record_pos):
+        path = []
+        pos = self.root
+        while pos != -1:
+            node = self._read_node(f, pos)
+            if self.stats:
+                self.stats.add("comparisons")
+            if key == node.key:
+                return False
+            went_left = key < node.key
+            path.append((node, went_left))
+            pos = node.left if went_left else node.right
+        self._retrace(f, path, self._new_node(f, key, record_pos))
+        return True
+
+    @timed("insert")
     def insert_record(self, record):
-        self.root = self.insert(self.root, record)
-        with open(self.datafile, "ab") as f:
-            f.write(record.pack())
+        # Una clave repetida se descarta antes de codificarla: con el formato compacto su nombre llegaría al heap
+        if self.search(self.index_file, record.employee_id) != -1:
+            return
+        packed = self.codec.encode(record)
+        if self.wal:
+            # Como en SequentialFile se registran los campos: la fila compacta depende del heap de nombres
+            self.wal.append(INSERT, json.dumps(vars(record)).encode())
+        self._insert_packed(record.employee_id, packed)
+        if self.cache:
+            self.cache.invalidate([record.employee_id])
+        self._maybe_checkpoint()
+
+    def _insert_packed(self, key, packed):
+        record_pos = self._data_len()
+        if self.insert(self.index_file, key, record_pos):
+            self._write_data(record_pos, packed)
+            if self.stats:
+                self.stats.add("records_written")
+            self._write_root(self.index_file)
+            self._sync()
+            if self.secondary:
+                self.secondary.add(self.codec.decode(packed))
 
     # === búsqueda ===
-    def search(self, node, key):
-        if not node:
-            return None
-        if key == node.record.employee_id:
-            return node.record
-        if key < node.record.employee_id:
-            return self.search(node.left, key)
-        return self.search(node.right, key)
+    def search(self, f, key):
+        pos = self.root
+        while pos != -1:
+            node = self._read_node(f, pos)
+            if self.stats:
+                self.stats.add("comparisons")
+            if key == node.key:
+                return node.record_pos
+            pos = node.left if key < node.key else node.right
+        return -1
 
+    @timed("search")
     def search_record(self, key):
-        return self.search(self.root, key)
-
-    def get_min(self, node):
-        while node.left:
-            node = node.left
-        return node
-
-    def remove(self, node, key):
-        if not node:
-            return node
-        if key < node.record.employee_id:
-            node.left = self.remove(node.left, key)
-        elif key > node.record.employee_id:
-            node.right = self.remove(node.right, key)
+        if self.cache:
+            return self.cache.get_or_compute(("point", key), lambda: self._search_record(key), self.stats)
+        return self._search_record(key)
+
+    def _search_record(self, key):
+        record_pos = self.search(self.index_file, key)
+        return self._read_record(record_pos) if record_pos != -1 else None
+
+    def remove(self, f, key):
+        path = []
+        pos = self.root
+        while pos != -1:
+            node = self._read_node(f, pos)
+            if self.stats:
+                self.stats.add("comparisons")
+            if key == node.key:
+                break
+            went_left = key < node.key
+            path.append((node, went_left))
+            pos = node.left if went_left else node.right
+        if pos == -1:
+            return False
+
+        if node.left == -1 or node.right == -1:
+            child = node.left if node.left != -1 else node.right
         else:
-            if not node.left:
-                return node.right
-            elif not node.right:
-                return node.left
-            temp = self.get_min(node.right)
-            node.record = temp.record
-            node.right = self.remove(node.right, temp.record.employee_id)
-
-        if not node:
-            return node
-
-        node.height = 1 + max(self.get_height(node.left), self.get_height(node.right))
-        balance = self.get_balance(node)
-
-        if balance > 1 and self.get_balance(node.left) >= 0:
-            return self.rotate_right(node)
-        if balance > 1 and self.get_balance(node.left) < 0:
-            node.left = self.rotate_left(node.left)
-            return self.rotate_right(node)
-        if balance < -1 and self.get_balance(node.right) <= 0:
-            return self.rotate_left(node)
-        if balance < -1 and self.get_balance(node.right) > 0:
-            node.right = self.rotate_right(node.right)
-            return self.rotate_left(node)
-
-        return node
+            path.append((node, False))
+            successor = self._read_node(f, node.right)
+            while successor.left != -1:
+                path.append((successor, True))
+                successor = self._read_node(f, successor.left)
+            node.key = successor.key
+            node.record_pos = successor.record_pos
+            self._write_node(f, node)
+            child = successor.right
+        self._retrace(f, path, child)
+        return True
 
+    @timed("remove")
     def remove_record(self, key):
-        self.root = self.remove(self.root, key)
+        if self.secondary:
+            record = self.search_record(key)
+            if record:
+                self.secondary.discard(record)
+        if self.wal:
+            self.wal.append(REMOVE, struct.pack("i", key))
+        self._remove_key(key)
+        if self.cache:
+            self.cache.invalidate([key])
+        self._maybe_checkpoint()
 
-    def range_search(self, node, start, end, result):
-        if not node:
-            return
-        if start < node.record.employee_id:
-            self.range_search(node.left, start, end, result)
-        if start <= node.record.employee_id <= end:
-            result.append(node.record)
-        if end > node.record.employee_id:
-            self.range_search(node.right, start, end, result)
+    def _remove_key(self, key):
+        if self.remove(self.index_file, key):
+            self._write_root(self.index_file)
+            self._sync()
+
+    def _iter_nodes(self, f, start, end):
+        stack = []
+        pos = self.root
+        while stack or pos != -1:
+            if pos != -1:
+                node = self._read_node(f, pos)
+                stack.append(node)
+                pos = node.left if start < node.key else -1
+                continue
+            node = stack.pop()
+            if self.stats:
+                self.stats.add("comparisons")
+            if node.key > end:
+                return
+            if node.key >= start:
+                yield node
+            pos = node.right
+
+    def range_search(self, f, start, end):
+        return [node.record_pos for node in self._iter_nodes(f, start, end)]
 
+    def iter_range(self, start, end):
+        for node in self._iter_nodes(self.index_file, start, end):
+            yield self._read_record(node.record_pos)
+
+    @timed("range_search")
     def range_search_records(self, start, end):
-        result = []
-        self.range_search(self.root, start, end, result)
-        return result
-
-    def import_from_csv(self, file):
-        data = pd.read_csv(file, sep=";")
-        for _, row in data.iterrows():
-            record = Record(int(row['Employee_ID']),
-                            row['Employee_Name'],
-                            int(row['Age']),
-                            row['Country'],
-                            row['Department'],
-                            row['Position'],
-                            float(row['Salary']),
-                            row['Joining_Date'])
-            self.insert_record(record)
-
-
-    
+        if self.cache:
+            return list(self.cache.get_or_compute(("range", start, end), lambda: list(self.iter_range(start, end)),
+                                                  self.stats))
+        return list(self.iter_range(start, end))
+
+    @timed("parallel_range_search")
+    def parallel_range_search(self, start, end, executor=None, workers=None):
+        # El índice da las posiciones en orden de clave; los procesos decodifican los registros
+        if self.codec.name != "fixed":
+            return self.range_search_records(start, end)
+        self.data_file.flush()
+        positions = self.range_search(self.index_file, start, end)
+        if self.stats:
+            self.stats.add("records_read", len(positions))
+            self.stats.add("unpacks", len(positions))
+        return [Record(*fields) for fields in parallel.read_positions(self.datafile, Record.FORMAT, positions,
+                                                                      executor, workers)]
+
+    @timed("build")
+    def _build(self, entries):
+        # Árbol perfectamente balanceado en O(n): el nodo i es la i-ésima clave en orden
+        nodes = [None] * len(entries)
+        stack = [(0, len(entries))] if entries else []
+        while stack:
+            lo, hi = stack.pop()
+            mid = (lo + hi) // 2
+            left = (lo + mid) // 2 if lo < mid else -1
+            right = (mid + 1 + hi) // 2 if mid + 1 < hi else -1
+            key, record_pos = entries[mid]
+            nodes[mid] = Node(mid, key, record_pos, left, right, (hi - lo).bit_length()).pack()
+            if lo < mid:
+                stack.append((lo, mid))
+            if mid + 1 < hi:
+                stack.append((mid + 1, hi))
+
+        self.root = len(entries) // 2 if entries else -1
+        self.index_file.seek(0)
+        self.index_file.truncate()
+        self.index_file.write(struct.pack(self.HEADER_FORMAT, self.root))
+        self.index_file.write(b"".join(nodes))
+        if self.stats:
+            self.stats.add("nodes_written", len(nodes))
+        self.index_file.flush()
+        self._invalidate()
+        self._sync()
+
+    def _bulk_load_rows(self, rows, encode):
+        if self.wal:
+            # La carga no se registra fila por fila: si se interrumpe, la recuperación la descarta entera
+            self.wal.append(BULK, b"")
+            self.wal.commit()
+        rows.sort(key=lambda row: row[0])
+        existing = [(node.key, node.record_pos)
+                    for node in self._iter_nodes(self.index_file, float("-inf"), float("inf"))]
+        keys = set(key for key, _ in existing)
+
+        batch = []
+        new_entries = []
+        first_pos = record_pos = self._data_len()
+        for key, row in rows:
+            if key in keys:
+                continue
+            keys.add(key)
+            # Solo se codifican las filas que se cargan
+            batch.append(encode(row))
+            new_entries.append((key, record_pos))
+            record_pos += 1
+
+        self._write_data(first_pos, b"".join(batch))
+        if self.stats:
+            self.stats.add("records_written", len(batch))
+        self._build(list(heapq.merge(existing, new_entries)))
+        if self.cache:
+            self.cache.invalidate(key for key, _ in new_entries)
+        if self.secondary:
+            for data in batch:
+                self.secondary.add(self.codec.decode(data))
+        if self.wal:
+            self.checkpoint()
+
+    @timed("bulk_load")
+    def bulk_load(self, records):
+        self._bulk_load_rows([(record.employee_id, record) for record in records], self.codec.encode)
+
+    @classmethod
+    def from_sorted(cls, datafile, records, indexfile=None):
+        avl = cls(datafile, indexfile)
+        avl.bulk_load(records)
+        return avl
+
+    @timed("import_from_csv")
+    def import_from_csv(self, file, chunksize=50000):
+        self.load_prepared(self.prepare_csv(file, chunksize))
+
+    # La importación en dos pasos permite leer el CSV sin bloquear el índice (ver aio.py)
+    @timed("prepare_csv")
+    def prepare_csv(self, file, chunksize=50000):
+        # Solo lee las filas: no toca el índice, así que puede correr junto a las lecturas
+        return [(row[0], row) for row in read_rows(file, ";", chunksize)]
+
+    @timed("load_prepared")
+    def load_prepared(self, rows):
+        self._bulk_load_rows(rows, self._encode_row)
+
+    def _encode_row(self, row):
+        return self.codec.encode_row(*row)
+
+    def create_index(self, field):
+        self.secondary.create(field, self.iter_range(float("-inf"), float("inf")))
+
+    def find_by(self, field, value):
+        return [self.search_record(key) for key in self.secondary.find(field, value)]
+
+    def range_by(self, field, low, high):
+        return [self.search_record(key) for key in self.secondary.range(field, low, high)]
@@ -0,0 +1,243 @@
+import struct
+import bisect
+import os
+from P1 import Record
+from csvrows import read_rows
+
+class Page:
+    SIZE = 4096
+    HEADER = struct.Struct("iii")
+    LEAF_CAPACITY = (SIZE - HEADER.size) // Record.FORMAT_SIZE
+    INTERNAL_CAPACITY = (SIZE - HEADER.size - 4) // 8
+
+    def __init__(self, page_id, is_leaf, keys=None, children=None, records=None, next_page=-1):
+        self.page_id = page_id
+        self.is_leaf = is_leaf
+        self.keys = keys if keys is not None else []
+        self.children = children if children is not None else []
+        self.records = records if records is not None else []
+        self.next_page = next_page
+
+    def pack(self):
+        header = self.HEADER.pack(self.is_leaf, len(self.keys), self.next_page)
+        if self.is_leaf:
+            body = b"".join(self.records)
+        else:
+            keys_area = struct.pack(f"{len(self.keys)}i", *self.keys).ljust(4 * self.INTERNAL_CAPACITY, b"\x00")
+            body = keys_area + struct.pack(f"{len(self.children)}i", *self.children)
+        return (header + body).ljust(self.SIZE, b"\x00")
+
+    @staticmethod
+    def unpack(page_id, data):
+        is_leaf, count, next_page = Page.HEADER.unpack_from(data)
+        if is_leaf:
+            offsets = range(Page.HEADER.size, Page.HEADER.size + count * Record.FORMAT_SIZE, Record.FORMAT_SIZE)
+            keys = [Record.KEY.unpack_from(data, offset)[0] for offset in offsets]
+            records = [data[offset:offset + Record.FORMAT_SIZE] for offset in offsets]
+            return Page(page_id, True, keys, records=records, next_page=next_page)
+        keys = list(struct.unpack_from(f"{count}i", data, Page.HEADER.size))
+        children = list(struct.unpack_from(f"{count + 1}i", data, Page.HEADER.size + 4 * Page.INTERNAL_CAPACITY))
+        return Page(page_id, False, keys, children, next_page=next_page)
+
+class BPlusTree:
+    HEADER_FORMAT = "i"
+
+    def __init__(self, datafile, buffer=None):
+        self.datafile = datafile
+        self.buffer = buffer
+        if os.path.exists(self.datafile) and os.path.getsize(self.datafile) >= 2 * Page.SIZE:
+            with open(self.datafile, "rb") as f:
+                self.root = struct.unpack(self.HEADER_FORMAT, f.read(struct.calcsize(self.HEADER_FORMAT)))[0]
+        else:
+            self.root = 1
+            with open(self.datafile, "wb") as f:
+                f.write(self._header())
+                f.write(Page(1, True).pack())
+            self._invalidate()
+
+    def _header(self):
+        return struct.pack(self.HEADER_FORMAT, self.root).ljust(Page.SIZE, b"\x00")
+
+    def _invalidate(self):
+        if self.buffer:
+            self.buffer.invalidate(self.datafile)
+
+    def flush(self):
+        if self.buffer:
+            self.buffer.flush(self.datafile)
+
+    def _read(self, f, offset, size):
+        if self.buffer:
+            return self.buffer.read(self.datafile, offset, size)
+        f.seek(offset)
+        return f.read(size)
+
+    def _write(self, f, offset, data):
+        if self.buffer:
+            self.buffer.write(self.datafile, offset, data)
+        else:
+            f.seek(offset)
+            f.write(data)
+
+    def _file_size(self, f):
+        if self.buffer:
+            return self.buffer.size(self.datafile)
+        f.seek(0, 2)
+        return f.tell()
+
+    def _write_header(self, f):
+        self._write(f, 0, self._header())
+
+    def _read_page(self, f, page_id):
+        return Page.unpack(page_id, self._read(f, page_id * Page.SIZE, Page.SIZE))
+
+    def _write_page(self, f, page):
+        self._write(f, page.page_id * Page.SIZE, page.pack())
+
+    def _append_page(self, f, page):
+        page.page_id = self._file_size(f) // Page.SIZE
+        self._write(f, page.page_id * Page.SIZE, page.pack())
+
+    def _find_leaf(self, f, key, path=None):
+        page = self._read_page(f, self.root)
+        while not page.is_leaf:
+            i = bisect.bisect_right(page.keys, key)
+            if path is not None:
+                path.append((page, i))
+            page = self._read_page(f, page.children[i])
+        return page
+
+    def _split_leaf(self, f, page):
+        mid = len(page.keys) // 2
+        right = Page(-1, True, page.keys[mid:], records=page.records[mid:], next_page=page.next_page)
+        self._append_page(f, right)
+        page.keys = page.keys[:mid]
+        page.records = page.records[:mid]
+        page.next_page = right.page_id
+        return right.keys[0], right.page_id
+
+    def _split_internal(self, f, page):
+        mid = len(page.keys) // 2
+        separator = page.keys[mid]
+        right = Page(-1, False, page.keys[mid + 1:], page.children[mid + 1:])
+        self._append_page(f, right)
+        page.keys = page.keys[:mid]
+        page.children = page.children[:mid + 1]
+        return separator, right.page_id
+
+    def _insert(self, f, key, data):
+        path = []
+        page = self._find_leaf(f, key, path)
+        i = bisect.bisect_left(page.keys, key)
+        if i < len(page.keys) and page.keys[i] == key:
+            return False
+        page.keys.insert(i, key)
+        page.records.insert(i, data)
+        split = self._split_leaf(f, page) if len(page.keys) > Page.LEAF_CAPACITY else None
+        self._write_page(f, page)
+
+        while split and path:
+            parent, i = path.pop()
+            separator, page_id = split
+            parent.keys.insert(i, separator)
+            parent.children.insert(i + 1, page_id)
+            split = self._split_internal(f, parent) if len(parent.keys) > Page.INTERNAL_CAPACITY else None
+            self._write_page(f, parent)
+
+        if split:
+            separator, page_id = split
+            root = Page(-1, False, [separator], [self.root, page_id])
+            self._append_page(f, root)
+            self.root = root.page_id
+            self._write_header(f)
+        return True
+
+    def insert(self, record):
+        with open(self.datafile, "r+b") as f:
+            return self._insert(f, record.employee_id, record.pack())
+
+    def search(self, key):
+        with open(self.datafile, "rb") as f:
+            page = self._find_leaf(f, key)
+        i = bisect.bisect_left(page.keys, key)
+        if i < len(page.keys) and page.keys[i] == key:
+            return Record.unpack(page.records[i])
+        return None
+
+    def remove(self, key):
+        # Eliminación perezosa: las hojas pueden quedar con pocos registros
+        with open(self.datafile, "r+b") as f:
+            page = self._find_leaf(f, key)
+            i = bisect.bisect_left(page.keys, key)
+            if i < len(page.keys) and page.keys[i] == key:
+                del page.keys[i]
+                del page.records[i]
+                self._write_page(f, page)
+                return True
+        return False
+
+    def iter_range(self, init_key, end_key):
+        with open(self.datafile, "rb") as f:
+            page = self._find_leaf(f, init_key)
+            i = bisect.bisect_left(page.keys, init_key)
+            while True:
+                while i < len(page.keys):
+                    if page.keys[i] > end_key:
+                        return
+                    yield Record.unpack(page.records[i])
+                    i += 1
+                if page.next_page == -1:
+                    return
+                page = self._read_page(f, page.next_page)
+                i = 0
+
+    def range_search(self, init_key, end_key):
+        return list(self.iter_range(init_key, end_key))
+
+    def _bulk_load(self, rows):
+        # Hojas llenas escritas en orden y luego cada nivel interno de abajo hacia arriba
+        self._invalidate()
+        with open(self.datafile, "wb") as f:
+            f.write(self._header())
+            level = []
+            for start in range(0, max(len(rows), 1), Page.LEAF_CAPACITY):
+                chunk = rows[start:start + Page.LEAF_CAPACITY]
+                page_id = len(level) + 1
+                next_page = page_id + 1 if start + Page.LEAF_CAPACITY < len(rows) else -1
+                f.write(Page(page_id, True, [key for key, _ in chunk],
+                             records=[data for _, data in chunk], next_page=next_page).pack())
+                level.append((chunk[0][0] if chunk else 0, page_id))
+
+            page_id = len(level) + 1
+            while len(level) > 1:
+                parents = []
+                for start in range(0, len(level), Page.INTERNAL_CAPACITY + 1):
+                    group = level[start:start + Page.INTERNAL_CAPACITY + 1]
+                    f.write(Page(page_id, False, [key for key, _ in group[1:]],
+                                 [child for _, child in group]).pack())
+                    parents.append((group[0][0], page_id))
+                    page_id += 1
+                level = parents
+
+            self.root = level[0][1]
+            f.seek(0)
+            f.write(self._header())
+        self._invalidate()
+
+    def import_from_csv(self, file, sep = ',', chunksize = 50000):
+        pack = struct.Struct(Record.FORMAT).pack
+        rows = {}
+        for row in read_rows(file, sep, chunksize):
+            employee_id, name, age, country, department, position, salary, joining_date = row
+            if employee_id not in rows:
+                rows[employee_id] = pack(employee_id, name.encode(), age, country.encode(),
+                                         department.encode(), position.encode(), salary,
+                                         joining_date.encode(), True)
+
+        with open(self.datafile, "r+b") as f:
+            root = self._read_page(f, self.root)
+            if not (root.is_leaf and not root.keys):
+                for key, data in rows.items():
+                    self._insert(f, key, data)
+                return
+        self._bulk_load(sorted(rows.items()))
@@ -0,0 +1,188 @@
+import struct
+import os
+from P1 import Record
+from csvrows import read_rows
+
+class Bucket:
+    SIZE = 4096
+    HEADER = struct.Struct("iii")
+    CAPACITY = (SIZE - HEADER.size) // Record.FORMAT_SIZE
+
+    def __init__(self, page_id, local_depth, keys=None, records=None, next_page=-1):
+        self.page_id = page_id
+        self.local_depth = local_depth
+        self.keys = keys if keys is not None else []
+        self.records = records if records is not None else []
+        self.next_page = next_page
+
+    def pack(self):
+        header = self.HEADER.pack(self.local_depth, len(self.keys), self.next_page)
+        return (header + b"".join(self.records)).ljust(self.SIZE, b"\x00")
+
+    @staticmethod
+    def unpack(page_id, data):
+        local_depth, count, next_page = Bucket.HEADER.unpack_from(data)
+        offsets = range(Bucket.HEADER.size, Bucket.HEADER.size + count * Record.FORMAT_SIZE, Record.FORMAT_SIZE)
+        keys = [Record.KEY.unpack_from(data, offset)[0] for offset in offsets]
+        records = [data[offset:offset + Record.FORMAT_SIZE] for offset in offsets]
+        return Bucket(page_id, local_depth, keys, records, next_page)
+
+class ExtendibleHash:
+    MAX_DEPTH = 20
+    DEPTH_FORMAT = "i"
+
+    def __init__(self, datafile, directoryfile=None, buffer=None):
+        self.datafile = datafile
+        self.buffer = buffer
+        self.directoryfile = directoryfile if directoryfile else datafile + ".dir"
+        if os.path.exists(self.datafile) and os.path.exists(self.directoryfile):
+            with open(self.directoryfile, "rb") as f:
+                data = f.read()
+            self.global_depth = struct.unpack_from(self.DEPTH_FORMAT, data)[0]
+            self.directory = list(struct.unpack_from(f"{1 << self.global_depth}i", data,
+                                                     struct.calcsize(self.DEPTH_FORMAT)))
+        else:
+            self.global_depth = 1
+            with open(self.datafile, "wb") as f:
+                f.write(Bucket(0, 1).pack())
+                f.write(Bucket(1, 1).pack())
+            if self.buffer:
+                self.buffer.invalidate(self.datafile)
+            self.directory = [0, 1]
+            self._write_directory()
+
+    def _write_directory(self):
+        with open(self.directoryfile, "wb") as f:
+            f.write(struct.pack(self.DEPTH_FORMAT, self.global_depth))
+            f.write(struct.pack(f"{len(self.directory)}i", *self.directory))
+
+    def _write_directory_entries(self, slots):
+        with open(self.directoryfile, "r+b") as f:
+            for slot in slots:
+                f.seek(struct.calcsize(self.DEPTH_FORMAT) + slot * 4)
+                f.write(struct.pack("i", self.directory[slot]))
+
+    def _slot(self, key):
+        return key & ((1 << self.global_depth) - 1)
+
+    def flush(self):
+        if self.buffer:
+            self.buffer.flush(self.datafile)
+
+    def _read_bucket(self, f, page_id):
+        if self.buffer:
+            return Bucket.unpack(page_id, self.buffer.read(self.datafile, page_id * Bucket.SIZE, Bucket.SIZE))
+        f.seek(page_id * Bucket.SIZE)
+        return Bucket.unpack(page_id, f.read(Bucket.SIZE))
+
+    def _write_bucket(self, f, bucket):
+        if self.buffer:
+            self.buffer.write(self.datafile, bucket.page_id * Bucket.SIZE, bucket.pack())
+            return
+        f.seek(bucket.page_id * Bucket.SIZE)
+        f.write(bucket.pack())
+
+    def _append_bucket(self, f, bucket):
+        if self.buffer:
+            bucket.page_id = self.buffer.size(self.datafile) // Bucket.SIZE
+        else:
+            f.seek(0, 2)
+            bucket.page_id = f.tell() // Bucket.SIZE
+        self._write_bucket(f, bucket)
+
+    def _chain(self, f, page_id):
+        while page_id != -1:
+            bucket = self._read_bucket(f, page_id)
+            yield bucket
+            page_id = bucket.next_page
+
+    def _write_chain(self, f, bucket, rows):
+        # Las páginas de desborde anteriores quedan sin uso; solo se encadenan páginas nuevas
+        first = rows[:Bucket.CAPACITY]
+        bucket.keys = [key for key, _ in first]
+        bucket.records = [data for _, data in first]
+        bucket.next_page = -1
+        previous = bucket
+        for start in range(Bucket.CAPACITY, len(rows), Bucket.CAPACITY):
+            chunk = rows[start:start + Bucket.CAPACITY]
+            overflow = Bucket(-1, bucket.local_depth, [key for key, _ in chunk], [data for _, data in chunk])
+            self._append_bucket(f, overflow)
+            previous.next_page = overflow.page_id
+            if previous is not bucket:
+                self._write_bucket(f, previous)
+            previous = overflow
+        self._write_bucket(f, bucket)
+
+    def _split(self, f, bucket, rows):
+        if bucket.local_depth == self.global_depth:
+            self.directory = self.directory + self.directory
+            self.global_depth += 1
+            self._write_directory()
+
+        bit = 1 << bucket.local_depth
+        bucket.local_depth += 1
+        sibling = Bucket(-1, bucket.local_depth)
+        self._append_bucket(f, sibling)
+        slots = range((rows[0][0] & (bit - 1)) | bit, len(self.directory), bit << 1)
+        for slot in slots:
+            self.directory[slot] = sibling.page_id
+        self._write_directory_entries(slots)
+
+        self._write_chain(f, bucket, [row for row in rows if not row[0] & bit])
+        self._write_chain(f, sibling, [row for row in rows if row[0] & bit])
+
+    def _insert(self, f, key, data):
+        while True:
+            buckets = list(self._chain(f, self.directory[self._slot(key)]))
+            for bucket in buckets:
+                if key in bucket.keys:
+                    return False
+            for bucket in buckets:
+                if len(bucket.keys) < Bucket.CAPACITY:
+                    bucket.keys.append(key)
+                    bucket.records.append(data)
+                    self._write_bucket(f, bucket)
+                    return True
+
+            primary = buckets[0]
+            if primary.local_depth < self.MAX_DEPTH:
+                rows = [(k, r) for bucket in buckets for k, r in zip(bucket.keys, bucket.records)]
+                self._split(f, primary, rows)
+                continue
+
+            overflow = Bucket(-1, primary.local_depth, [key], [data])
+            self._append_bucket(f, overflow)
+            buckets[-1].next_page = overflow.page_id
+            self._write_bucket(f, buckets[-1])
+            return True
+
+    def insert(self, record):
+        with open(self.datafile, "r+b") as f:
+            return self._insert(f, record.employee_id, record.pack())
+
+    def search(self, key):
+        with open(self.datafile, "rb") as f:
+            for bucket in self._chain(f, self.directory[self._slot(key)]):
+                if key in bucket.keys:
+                    return Record.unpack(bucket.records[bucket.keys.index(key)])
+        return None
+
+    def remove(self, key):
+        with open(self.datafile, "r+b") as f:
+            for bucket in self._chain(f, self.directory[self._slot(key)]):
+                if key in bucket.keys:
+                    i = bucket.keys.index(key)
+                    del bucket.keys[i]
+                    del bucket.records[i]
+                    self._write_bucket(f, bucket)
+                    return True
+        return False
+
+    def import_from_csv(self, file, sep = ',', chunksize = 50000):
+        pack = struct.Struct(Record.FORMAT).pack
+        with open(self.datafile, "r+b") as f:
+            for row in read_rows(file, sep, chunksize):
+                employee_id, name, age, country, department, position, salary, joining_date = row
+                self._insert(f, employee_id, pack(employee_id, name.encode(), age, country.encode(),
+                                                  department.encode(), position.encode(), salary,
+                                                  joining_date.encode(), True))
@@ -0,0 +1,154 @@
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from P2 import AVL
+from rwlock import RWLock
+
+
+class AsyncStore:
+    # Fachada asyncio para SequentialFile o AVL: la E/S bloqueante corre en hilos y no detiene el event loop
+    def __init__(self, store, workers=4, batch=256):
+        self.store = store
+        self.batch = batch
+        self.avl = isinstance(store, AVL)
+        # Las lecturas tienen su propio pool; cargas y escrituras van a un hilo aparte y no les quitan hilos
+        self.readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aio-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aio-write")
+        # SequentialFile ya tiene su propio lock. El AVL lee por posición, así que las lecturas corren en paralelo;
+        # las escrituras modifican el árbol en su lugar y van solas
+        self.lock = RWLock() if self.avl else None
+        self.inflight = {}
+        self.writes = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _reading(self, fn, *args):
+        if self.lock is None:
+            return fn(*args)
+        with self.lock.read():
+            return fn(*args)
+
+    def _writing(self, fn, *args):
+        if self.lock is None:
+            return fn(*args)
+        with self.lock.write():
+            return fn(*args)
+
+    def _submit(self, executor, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+
+    async def _read(self, key, fn, *args):
+        # Lecturas idénticas en curso comparten un solo trabajo; una escritura iniciada después cambia la clave
+        key = (self.writes,) + key
+        entry = self.inflight.get(key)
+        if entry is None:
+            entry = [self._submit(self.readers, fn, *args), 0]
+            self.inflight[key] = entry
+            entry[0].add_done_callback(functools.partial(self._done, key, entry))
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            # Si todos los que esperaban se cancelaron, se cancela el trabajo si aún no empezó
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+
+    def _done(self, key, entry, future):
+        if self.inflight.get(key) is entry:
+            del self.inflight[key]
+
+    async def _write(self, fn, *args):
+        self.writes += 1
+        return await self._submit(self.writer, self._writing, fn, *args)
+
+    async def search(self, key):
+        fn = self.store.search_record if self.avl else self.store.search
+        return await self._read(("point", key), self._reading, fn, key)
+
+    async def range_search(self, start, end):
+        if not self.avl:
+            fn = self.store.range_search
+        elif self.store.cache:
+            # La caché guarda el resultado completo: se calcula entero bajo el lock
+            fn = functools.partial(self._reading, self.store.range_search_records)
+        else:
+            fn = self._avl_range
+        return list(await self._read(("range", start, end), fn, start, end))
+
+    def _avl_positions(self, start, end):
+        with self.lock.read():
+            return self.store.range_search(self.store.index_file, start, end)
+
+    def _avl_range(self, start, end):
+        # Solo el recorrido del índice toma el lock: un escaneo largo no hace esperar a las escrituras
+        return self._avl_records(self._avl_positions(start, end))
+
+    def _avl_records(self, positions):
+        # El datafile del AVL solo crece: las posiciones ya tomadas siguen siendo válidas sin el lock
+        return self.store.read_records(positions)
+
+    async def iter_range(self, start, end):
+        # Se piden lotes al iterador síncrono; cancelar o salir del async for cierra la consulta
+        if self.avl:
+            positions = await self._read(("positions", start, end), self._avl_positions, start, end)
+            for i in range(0, len(positions), self.batch):
+                for record in await self._submit(self.readers, self._avl_records, positions[i:i + self.batch]):
+                    yield record
+            return
+        iterator = self.store.iter_range(start, end)
+        job = None
+        try:
+            while True:
+                job = self.readers.submit(lambda: list(itertools.islice(iterator, self.batch)))
+                records = await asyncio.wrap_future(job)
+                for record in records:
+                    yield record
+                if len(records) < self.batch:
+                    return
+        finally:
+            # Un lote que ya corre en un hilo no se interrumpe: el iterador se cierra cuando termina
+            if job is not None and not job.cancel():
+                job.add_done_callback(lambda _: iterator.close())
+            else:
+                iterator.close()
+
+    async def insert(self, record):
+        return await self._write(self.store.insert_record if self.avl else self.store.insert, record)
+
+    async def insert_many(self, records):
+        records = list(records)
+        if self.avl:
+            # Por lotes de batch registros: las lecturas pueden intercalarse entre lotes
+            for i in range(0, len(records), self.batch):
+                await self._write(self._insert_records, records[i:i + self.batch])
+            return
+        return await self._write(self.store.insert_many, records)
+
+    def _insert_records(self, records):
+        for record in records:
+            self.store.insert_record(record)
+
+    async def remove(self, key):
+        return await self._write(self.store.remove_record if self.avl else self.store.remove, key)
+
+    async def import_from_csv(self, file, **kwargs):
+        if self.avl:
+            # Leer el CSV no toca el índice: el lock exclusivo se toma solo para la carga
+            rows = await self._submit(self.writer, functools.partial(self.store.prepare_csv, file, **kwargs))
+            return await self._write(self.store.load_prepared, rows)
+        return await self._write(functools.partial(self.store.import_from_csv, file, **kwargs))
+
+    async def flush(self):
+        return await self._write(self.store.flush)
+
+    async def close(self):
+        # Primero terminan las lecturas en cola, sin tomar el lock que ellas esperan; luego se cierran los archivos
+        await asyncio.get_running_loop().run_in_executor(None, self.readers.shutdown)
+        await self._write(self.store.close)
+        self.writer.shutdown(wait=False)
@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+from P1 import SequentialFile, Record as SeqRecord
+from P2 import AVL, Record as AVLRecord
+from P3 import BPlusTree
+from P4 import ExtendibleHash
+
+COUNTRIES = ['USA', 'UK', 'Germany', 'France', 'Spain', 'Italy', 'Canada', 'Australia']
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'HR', 'Finance', 'Operations']
+POSITIONS = ['Manager', 'Developer', 'Analyst', 'Coordinator', 'Director', 'Assistant']
+SELECTIVITIES = [0.0001, 0.001, 0.01, 0.1]
+
+
+def clean_files(files):
+    for file in files:
+        if os.path.exists(file):
+            os.remove(file)
+
+
+class SequentialTarget:
+    name = 'sequential'
+    ranges = True
+
+    def __init__(self, workdir):
+        self.files = [os.path.join(workdir, 'bench_seq.dat'), os.path.join(workdir, 'bench_seq_aux.dat')]
+        clean_files(self.files)
+        self.store = SequentialFile(*self.files)
+
+    def load(self, csvfile):
+        self.store.import_from_csv(csvfile, sep=';')
+
+    def search(self, key):
+        return self.store.search(key)
+
+    def range_search(self, low, high):
+        return self.store.range_search(low, high)
+
+    def insert(self, fields):
+        self.store.insert(SeqRecord(*fields))
+
+    def remove(self, key):
+        self.store.remove(key)
+
+    def close(self):
+        self.store.close()
+
+
+class AVLTarget:
+    name = 'avl'
+    ranges = True
+
+    def __init__(self, workdir):
+        datafile = os.path.join(workdir, 'bench_avl.dat')
+        self.files = [datafile, datafile + '.idx']
+        clean_files(self.files)
+        self.store = AVL(datafile)
+
+    def load(self, csvfile):
+        self.store.import_from_csv(csvfile)
+
+    def search(self, key):
+        return self.store.search_record(key)
+
+    def range_search(self, low, high):
+        return self.store.range_search_records(low, high)
+
+    def insert(self, fields):
+        self.store.insert_record(AVLRecord(*fields))
+
+    def remove(self, key):
+        self.store.remove_record(key)
+
+    def close(self):
+        self.store.close()
+
+
+class BPlusTarget:
+    name = 'bplus'
+    ranges = True
+
+    def __init__(self, workdir):
+        self.files = [os.path.join(workdir, 'bench_bplus.dat')]
+        clean_files(self.files)
+        self.store = BPlusTree(self.files[0])
+
+    def load(self, csvfile):
+        self.store.import_from_csv(csvfile, sep=';')
+
+    def search(self, key):
+        return self.store.search(key)
+
+    def range_search(self, low, high):
+        return self.store.range_search(low, high)
+
+    def insert(self, fields):
+        self.store.insert(SeqRecord(*fields))
+
+    def remove(self, key):
+        self.store.remove(key)
+
+    def close(self):
+        pass
+
+
+class HashTarget:
+    name = 'hash'
+    ranges = False
+
+    def __init__(self, workdir):
+        datafile = os.path.join(workdir, 'bench_hash.dat')
+        self.files = [datafile, datafile + '.dir']
+        clean_files(self.files)
+        self.store = ExtendibleHash(datafile)
+
+    def load(self, csvfile):
+        self.store.import_from_csv(csvfile, sep=';')
+
+    def search(self, key):
+        return self.store.search(key)
+
+    def insert(self, fields):
+        self.store.insert(SeqRecord(*fields))
+
+    def remove(self, key):
+        self.store.remove(key)
+
+    def close(self):
+        self.store.flush()
+
+
+TARGETS = {target.name: target for target in (SequentialTarget, AVLTarget, BPlusTarget, HashTarget)}
+
+
+def io_counters():
+    # Bytes leídos/escritos por el proceso según el kernel; None fuera de Linux
+    try:
+        with open('/proc/self/io') as f:
+            return {key: int(value) for key, value in (line.split(': ') for line in f)}
+    except OSError:
+        return None
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Benchmark:
+    def __init__(self, sizes, targets, ops, range_ops, workdir, seed):
+        self.sizes = sizes
+        self.targets = targets
+        self.ops = ops
+        self.range_ops = range_ops
+        self.workdir = workdir
+        self.seed = seed
+        self.results = []
+
+    def generate_csv(self, size, rng):
+        # Claves pares para los registros cargados; las impares quedan libres para inserciones
+        keys = [2 * key for key in rng.sample(range(1, 2 * size + 1), size)]
+        csvfile = os.path.join(self.workdir, f'bench_{size}.csv')
+        with open(csvfile, 'w') as f:
+            f.write('Employee_ID;Employee_Name;Age;Country;Department;Position;Salary;Joining_Date\n')
+            for start in range(0, size, 100000):
+                f.write(''.join(f'{key};Employee_{key};{rng.randint(22, 65)};{rng.choice(COUNTRIES)};'
+                                f'{rng.choice(DEPARTMENTS)};{rng.choice(POSITIONS)};'
+                                f'{rng.uniform(30000, 150000):.2f};2020-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}\n'
+                                for key in keys[start:start + 100000]))
+        return csvfile, keys
+
+    def random_fields(self, key, rng):
+        return (key, f'Employee_{key}', rng.randint(22, 65), rng.choice(COUNTRIES), rng.choice(DEPARTMENTS),
+                rng.choice(POSITIONS), round(rng.uniform(30000, 150000), 2),
+                f'2020-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}')
+
+    def record(self, target, size, workload, latencies, elapsed, io_before, items=None, **extra):
+        latencies.sort()
+        io_after = io_counters()
+        result = {'organization': target.name, 'size': size, 'workload': workload,
+                  'operations': len(latencies), 'seconds': elapsed,
+                  'ops_per_s': len(latencies) / elapsed if elapsed else None,
+                  'p50_ms': percentile(latencies, 0.50) * 1000 if latencies else None,
+                  'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None}
+        if items is not None:
+            result['records'] = items
+            result['records_per_s'] = items / elapsed if elapsed else None
+        if io_before and io_after:
+            for key in ('read_bytes', 'write_bytes', 'rchar', 'wchar'):
+                result[key] = io_after[key] - io_before[key]
+        result.update(extra)
+        self.results.append(result)
+        p50 = f"{result['p50_ms']:.4f}" if result['p50_ms'] is not None else '-'
+        p99 = f"{result['p99_ms']:.4f}" if result['p99_ms'] is not None else '-'
+        rate = result.get('records_per_s') or result['ops_per_s'] or 0
+        print(f"{target.name:<10} {size:>9} {workload:<22} {rate:>14.0f}/s  p50 {p50:>9} ms  p99 {p99:>9} ms  "
+              f"lectura {result.get('read_bytes', 0):>12} B  escritura {result.get('write_bytes', 0):>12} B")
+
+    def timed(self, operations):
+        latencies = []
+        io_before = io_counters()
+        start = time.perf_counter()
+        items = None
+        for operation, argument in operations:
+            op_start = time.perf_counter()
+            result = operation(*argument)
+            latencies.append(time.perf_counter() - op_start)
+            if isinstance(result, list):
+                items = (items or 0) + len(result)
+        return latencies, time.perf_counter() - start, io_before, items
+
+    def run_target(self, target_class, size, csvfile, keys, rng):
+        target = target_class(self.workdir)
+        sorted_keys = sorted(keys)
+
+        # Carga masiva desde CSV
+        io_before = io_counters()
+        start = time.perf_counter()
+        target.load(csvfile)
+        elapsed = time.perf_counter() - start
+        self.record(target, size, 'bulk_load', [elapsed], elapsed, io_before, items=size)
+
+        # Búsquedas puntuales aleatorias y secuenciales
+        sample = [rng.choice(keys) for _ in range(self.ops)]
+        self.record(target, size, 'lookup_random', *self.timed((target.search, (key,)) for key in sample))
+        first = rng.randrange(max(1, size - self.ops))
+        sample = sorted_keys[first:first + self.ops]
+        self.record(target, size, 'lookup_sequential', *self.timed((target.search, (key,)) for key in sample))
+
+        # Búsquedas por rango con distintas selectividades
+        if target.ranges:
+            for selectivity in SELECTIVITIES:
+                width = max(1, int(size * selectivity))
+                queries = []
+                for _ in range(self.range_ops):
+                    low = rng.randrange(max(1, size - width + 1))
+                    queries.append((sorted_keys[low], sorted_keys[min(low + width, size) - 1]))
+                latencies, elapsed, io_before, items = self.timed((target.range_search, query) for query in queries)
+                self.record(target, size, f'range_{selectivity:g}', latencies, elapsed, io_before,
+                            items=items, selectivity=selectivity)
+
+        # Carga mixta: 90% lecturas, 10% inserciones de claves nuevas (impares)
+        new_keys = iter([2 * key + 1 for key in rng.sample(range(size), min(self.ops, size))])
+        operations = []
+        for _ in range(self.ops):
+            if rng.random() < 0.9:
+                operations.append((target.search, (rng.choice(keys),)))
+            else:
+                operations.append((target.insert, (self.random_fields(next(new_keys), rng),)))
+        self.record(target, size, 'mixed_90r_10w', *self.timed(operations), read_ratio=0.9)
+
+        # Eliminaciones de claves distintas y existentes
+        victims = rng.sample(keys, min(self.ops, size))
+        self.record(target, size, 'delete', *self.timed((target.remove, (key,)) for key in victims))
+
+        target.close()
+        clean_files(target.files)
+
+    def run(self):
+        print(f"{'estructura':<10} {'tamaño':>9} {'carga':<22} {'throughput':>16}")
+        for size in self.sizes:
+            rng = random.Random(self.seed)
+            csvfile, keys = self.generate_csv(size, rng)
+            for name in self.targets:
+                self.run_target(TARGETS[name], size, csvfile, keys, random.Random(self.seed + size))
+            os.remove(csvfile)
+
+    def metadata(self):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit,
+                'python': sys.version.split()[0], 'platform': platform.platform(),
+                'sizes': self.sizes, 'organizations': self.targets, 'ops': self.ops,
+                'range_ops': self.range_ops, 'seed': self.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pruebas de rendimiento de las organizaciones de archivos')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='cantidades de registros (hasta 10000000)')
+    parser.add_argument('--orgs', nargs='+', choices=sorted(TARGETS), default=list(TARGETS),
+                        help='organizaciones a medir')
+    parser.add_argument('--ops', type=int, default=1000, help='operaciones por carga puntual')
+    parser.add_argument('--range-ops', type=int, default=20, help='consultas por selectividad de rango')
+    parser.add_argument('--workdir', default='.', help='carpeta para los archivos temporales')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='archivo JSON con los resultados')
+    args = parser.parse_args()
+
+    benchmark = Benchmark(args.sizes, args.orgs, args.ops, args.range_ops, args.workdir, args.seed)
+    benchmark.run()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': benchmark.metadata(), 'results': benchmark.results}, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import os
+import threading
+from collections import OrderedDict
+
+class BufferManager:
+    def __init__(self, capacity=256, page_size=4096):
+        self.capacity = capacity
+        self.page_size = page_size
+        self.pages = OrderedDict()
+        self.dirty = set()
+        self.files = {}
+        self.sizes = {}
+        self.lock = threading.RLock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / requests if requests else 0.0,
+                    "evictions": self.evictions, "writebacks": self.writebacks,
+                    "cached_pages": len(self.pages), "dirty_pages": len(self.dirty)}
+
+    def _file(self, path):
+        f = self.files.get(path)
+        if f is None:
+            f = open(path, "r+b")
+            self.files[path] = f
+            self.sizes[path] = os.fstat(f.fileno()).st_size
+        return f
+
+    def _write_back(self, key, page):
+        path, page_no = key
+        f = self._file(path)
+        length = min(self.page_size, self.sizes[path] - page_no * self.page_size)
+        if length > 0:
+            f.seek(page_no * self.page_size)
+            f.write(page[:length])
+        self.dirty.discard(key)
+        self.writebacks += 1
+
+    def _page(self, path, page_no):
+        key = (path, page_no)
+        page = self.pages.get(key)
+        if page is not None:
+            self.hits += 1
+            self.pages.move_to_end(key)
+            return page
+
+        self.misses += 1
+        f = self._file(path)
+        f.seek(page_no * self.page_size)
+        page = bytearray(f.read(self.page_size).ljust(self.page_size, b"\x00"))
+        self.pages[key] = page
+        while len(self.pages) > self.capacity:
+            old_key, old_page = self.pages.popitem(last=False)
+            if old_key in self.dirty:
+                self._write_back(old_key, old_page)
+            self.evictions += 1
+        return page
+
+    def size(self, path):
+        with self.lock:
+            self._file(path)
+            return self.sizes[path]
+
+    def read(self, path, offset, size):
+        with self.lock:
+            self._file(path)
+            end = min(offset + size, self.sizes[path])
+            chunks = []
+            while offset < end:
+                page_no, start = divmod(offset, self.page_size)
+                length = min(self.page_size - start, end - offset)
+                chunks.append(bytes(self._page(path, page_no)[start:start + length]))
+                offset += length
+            return b"".join(chunks)
+
+    def write(self, path, offset, data):
+        with self.lock:
+            self._file(path)
+            end = offset + len(data)
+            written = 0
+            while offset < end:
+                page_no, start = divmod(offset, self.page_size)
+                length = min(self.page_size - start, end - offset)
+                self._page(path, page_no)[start:start + length] = data[written:written + length]
+                self.dirty.add((path, page_no))
+                offset += length
+                written += length
+            self.sizes[path] = max(self.sizes[path], end)
+
+    def flush(self, path=None):
+        with self.lock:
+            for key in sorted(self.dirty):
+                if path is None or key[0] == path:
+                    self._write_back(key, self.pages[key])
+            for file_path, f in self.files.items():
+                if path is None or file_path == path:
+                    f.flush()
+
+    def invalidate(self, path):
+        # Descarta las páginas de un archivo reescrito fuera del buffer
+        with self.lock:
+            for key in [key for key in self.pages if key[0] == path]:
+                del self.pages[key]
+                self.dirty.discard(key)
+            f = self.files.pop(path, None)
+            if f is not None:
+                f.close()
+            self.sizes.pop(path, None)
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            for f in self.files.values():
+                f.close()
+            self.files.clear()
+            self.sizes.clear()
+            self.pages.clear()
+
+class BufferedFile:
+    def __init__(self, buffer, path):
+        self.buffer = buffer
+        self.path = path
+
+    def __len__(self):
+        return self.buffer.size(self.path)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            return self.buffer.read(self.path, start, max(stop - start, 0))
+        return self.buffer.read(self.path, index, 1)[0]
+
+    def __setitem__(self, index, value):
+        self.buffer.write(self.path, index, bytes([value]))
@@ -0,0 +1,310 @@
+import os
+import json
+import mmap
+import struct
+import threading
+import datetime
+import functools
+from wal import fsync_dir
+
+EPOCH = datetime.date(1970, 1, 1)
+# Patrón para leer la fecha y plantilla que la reescribe igual, incluidos días y meses sin cero inicial
+DATE_FORMATS = (('%Y-%m-%d', '{y:04d}-{m:02d}-{d:02d}'),
+                ('%d/%m/%Y', '{d:02d}/{m:02d}/{y:04d}'),
+                ('%d/%m/%Y', '{d}/{m:02d}/{y:04d}'),
+                ('%d/%m/%Y', '{d}/{m}/{y:04d}'))
+RAW_DATE = 255
+
+
+class FixedCodec:
+    # Formato original: campos de texto de largo fijo rellenados con ceros
+    name = 'fixed'
+
+    def __init__(self, record):
+        self.record = record
+        self.size = record.FORMAT_SIZE
+        # El Record del AVL no guarda el byte active: sus filas siempre están vivas
+        self.active_offset = getattr(record, 'ACTIVE_OFFSET', None)
+        self._pack = struct.Struct(record.FORMAT).pack
+
+    def encode_row(self, employee_id, employee_name, age, country, department, position, salary, joining_date,
+                   active = True):
+        fields = (employee_id, employee_name.encode(), age, country.encode(), department.encode(),
+                  position.encode(), salary, joining_date.encode())
+        if self.active_offset is None:
+            return self._pack(*fields)
+        return self._pack(*fields, active)
+
+    def encode(self, record):
+        return record.pack()
+
+    def decode(self, data, offset = 0):
+        return self.record.unpack(data, offset)
+
+    def reader(self):
+        return self.decode
+
+    def rewrite(self):
+        # Las filas fijas no apuntan a otro archivo: se copian tal cual
+        return None
+
+    def flush(self, fsync = False):
+        pass
+
+    def close(self):
+        pass
+
+
+class Heap:
+    # Archivo de nombres: solo crece y se lee por posición
+    REMAP_BYTES = 1 << 20
+
+    def __init__(self, path, truncate = False):
+        if truncate or not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(b'')
+        self.file = open(path, 'r+b')
+        self.file.seek(0, 2)
+        self.size = self.file.tell()
+        self.lock = threading.Lock()
+        self._map = b''
+
+    def append(self, data):
+        with self.lock:
+            offset = self.size
+            self.file.write(data)
+            self.size += len(data)
+        return offset
+
+    def read(self, offset, length):
+        heap = self._map
+        if offset + length > len(heap):
+            with self.lock:
+                self.file.flush()
+                # Los nombres recientes se leen directo; el heap se vuelve a mapear cuando la cola crece.
+                # El mapeo anterior no se cierra: otro hilo puede estar leyéndolo
+                if self.size - len(self._map) < self.REMAP_BYTES:
+                    return self._pread(offset, length)
+                self._map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                heap = self._map
+        return heap[offset:offset + length]
+
+    def _pread(self, offset, length):
+        if hasattr(os, 'pread'):
+            return os.pread(self.file.fileno(), length, offset)
+        # Sin os.pread (Windows) se lee con seek bajo el lock y la posición vuelve al final para las escrituras
+        self.file.seek(offset)
+        data = self.file.read(length)
+        self.file.seek(0, 2)
+        return data
+
+    def flush(self, fsync = False):
+        with self.lock:
+            self.file.flush()
+            if fsync:
+                os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = b''
+        self.file.close()
+
+
+class HeapRewrite:
+    # Copia a un heap nuevo solo los nombres de las filas que pasan al archivo principal nuevo
+    NAME = struct.Struct('<IH')
+    NAME_OFFSET = 4
+    NAME_END = NAME_OFFSET + NAME.size
+    CHUNK = 1 << 20
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.old = codec.heap
+        self.path = f'{codec.heapfile}.{threading.get_ident()}.tmp'
+        self.heap = Heap(self.path, truncate = True)
+        # Solo este rebuild escribe en el heap nuevo: los nombres se juntan y se escriben por bloques
+        self.names = []
+        self.buffered = 0
+
+    def relocate(self, data):
+        offset, length = self.NAME.unpack_from(data, self.NAME_OFFSET)
+        self.names.append(self.old.read(offset, length))
+        row = data[:self.NAME_OFFSET] + self.NAME.pack(self.heap.size + self.buffered, length) + data[self.NAME_END:]
+        self.buffered += length
+        if self.buffered >= self.CHUNK:
+            self._write_names()
+        return row
+
+    def _write_names(self):
+        self.heap.append(b''.join(self.names))
+        self.names = []
+        self.buffered = 0
+
+    def commit(self, tmpfile, swap):
+        # El .codec anota el intercambio: si se interrumpe, al abrir se completa o se descarta según
+        # si el archivo principal nuevo alcanzó a reemplazar al anterior
+        self._write_names()
+        self.heap.flush(True)
+        codec = self.codec
+        with codec.lock:
+            codec.pending = {'main': tmpfile, 'heap': self.path}
+            codec._save()
+            swap(tmpfile)
+            os.replace(self.path, codec.heapfile)
+            codec.heap = self.heap
+            codec.pending = None
+            codec._save()
+
+    def cancel(self):
+        self.heap.close()
+        os.remove(self.path)
+
+
+class CompactCodec:
+    # id, posición y largo del nombre en el heap, edad, códigos de diccionario, salario, fecha en días, activo
+    name = 'compact'
+    FORMAT = '<iIHHHHHfiBb'
+    size = struct.calcsize(FORMAT)
+    active_offset = size - 1
+    FIELDS = ('country', 'department', 'position', 'dates')
+
+    def __init__(self, datafile, record):
+        self.record = record
+        self.codecfile = datafile + '.codec'
+        self.heapfile = datafile + '.heap'
+        self.row = struct.Struct(self.FORMAT)
+        self.lock = threading.Lock()
+        self.vocab = {field: [] for field in self.FIELDS}
+        self.pending = None
+        if os.path.exists(self.codecfile):
+            with open(self.codecfile) as f:
+                stored = json.load(f)
+            self.vocab.update(stored['vocab'])
+            if stored.get('pending'):
+                self._finish_rewrite(stored['pending'])
+        else:
+            self._save()
+        self.codes = {field: {value: code for code, value in enumerate(values)}
+                      for field, values in self.vocab.items()}
+        self.heap = Heap(self.heapfile)
+        self._dates = {}
+        self._date_strings = {}
+
+    def _save(self):
+        # Los códigos nuevos se guardan antes de que alguna fila los use
+        tmpfile = self.codecfile + '.tmp'
+        state = {'codec': self.name, 'vocab': self.vocab}
+        if self.pending:
+            state['pending'] = self.pending
+        with open(tmpfile, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmpfile, self.codecfile)
+        fsync_dir(self.codecfile)
+
+    def _finish_rewrite(self, pending):
+        # Un rebuild se interrumpió al intercambiar archivos: el heap nuevo solo vale si el principal nuevo
+        # ya ocupa su lugar
+        if os.path.exists(pending['main']):
+            if os.path.exists(pending['heap']):
+                os.remove(pending['heap'])
+        elif os.path.exists(pending['heap']):
+            os.replace(pending['heap'], self.heapfile)
+        self._save()
+
+    def _code(self, field, value):
+        code = self.codes[field].get(value)
+        if code is None:
+            with self.lock:
+                code = self.codes[field].get(value)
+                if code is None:
+                    code = len(self.vocab[field])
+                    self.vocab[field].append(value)
+                    self.codes[field][value] = code
+                    self._save()
+        return code
+
+    def _encode_date(self, joining_date):
+        encoded = self._dates.get(joining_date)
+        if encoded is None:
+            for fmt, (pattern, template) in enumerate(DATE_FORMATS):
+                try:
+                    date = datetime.datetime.strptime(joining_date, pattern).date()
+                except ValueError:
+                    continue
+                if template.format(y=date.year, m=date.month, d=date.day) == joining_date:
+                    encoded = ((date - EPOCH).days, fmt)
+                    break
+            else:
+                # Fechas que no se pueden reconstruir exactamente se guardan como texto en el diccionario
+                encoded = (self._code('dates', joining_date), RAW_DATE)
+            self._dates[joining_date] = encoded
+        return encoded
+
+    def _decode_date(self, days, fmt):
+        if fmt == RAW_DATE:
+            return self.vocab['dates'][days]
+        text = self._date_strings.get((days, fmt))
+        if text is None:
+            date = EPOCH + datetime.timedelta(days=days)
+            text = DATE_FORMATS[fmt][1].format(y=date.year, m=date.month, d=date.day)
+            self._date_strings[(days, fmt)] = text
+        return text
+
+    def encode_row(self, employee_id, employee_name, age, country, department, position, salary, joining_date,
+                   active = True):
+        name = employee_name.encode()
+        offset = self.heap.append(name)
+        days, fmt = self._encode_date(joining_date)
+        return self.row.pack(employee_id, offset, len(name), age, self._code('country', country),
+                             self._code('department', department), self._code('position', position),
+                             salary, days, fmt, active)
+
+    def encode(self, record):
+        return self.encode_row(record.employee_id, record.employee_name, record.age, record.country,
+                               record.department, record.position, record.salary, record.joining_date,
+                               record.active)
+
+    def decode(self, data, offset = 0):
+        return self._decode(self.heap, data, offset)
+
+    def reader(self):
+        # Decodifica contra el heap actual aunque un rebuild lo reemplace después
+        return functools.partial(self._decode, self.heap)
+
+    def rewrite(self):
+        return HeapRewrite(self)
+
+    def _decode(self, heap, data, offset = 0):
+        (employee_id, name_offset, name_length, age, country, department, position,
+         salary, days, fmt, active) = self.row.unpack_from(data, offset)
+        name = heap.read(name_offset, name_length).decode()
+        return self.record(employee_id, name, age, self.vocab['country'][country],
+                           self.vocab['department'][department], self.vocab['position'][position], salary,
+                           self._decode_date(days, fmt), active)
+
+    def flush(self, fsync = False):
+        self.heap.flush(fsync)
+
+    def close(self):
+        self.heap.close()
+
+
+def open_codec(datafile, record, name = None):
+    # El formato queda fijado por archivo: el sidecar .codec indica el compacto; sin sidecar es el fijo
+    if os.path.exists(datafile + '.codec'):
+        with open(datafile + '.codec') as f:
+            stored = json.load(f)['codec']
+        if name is not None and name != stored:
+            raise ValueError(f"{datafile} usa el formato {stored}, no {name}")
+        name = stored
+    elif name is not None and name != FixedCodec.name and os.path.exists(datafile) and os.path.getsize(datafile):
+        raise ValueError(f"{datafile} ya tiene registros con el formato {FixedCodec.name}")
+    if name in (None, FixedCodec.name):
+        return FixedCodec(record)
+    if name == CompactCodec.name:
+        return CompactCodec(datafile, record)
+    raise ValueError(f"Formato desconocido: {name}")
@@ -0,0 +1,83 @@
+import os
+import re
+import struct
+import numpy as np
+from P1 import Record
+from P2 import Record as AVLRecord
+
+FIELDS = ["employee_id", "employee_name", "age", "country", "department",
+          "position", "salary", "joining_date", "active"]
+NUMPY_TYPES = {"i": "i4", "f": "f4", "b": "i1", "s": "S"}
+
+
+def record_dtype(fmt):
+    # Mismo layout que struct (alineación nativa) para poder mapear el archivo tal cual
+    tokens = re.findall(r"\d*[a-z]", fmt)
+    names, formats, offsets = [], [], []
+    for i, token in enumerate(tokens):
+        names.append(FIELDS[i])
+        formats.append(NUMPY_TYPES["s"] + token[:-1] if token[-1] == "s" else NUMPY_TYPES[token])
+        offsets.append(struct.calcsize("".join(tokens[:i + 1])) - struct.calcsize(token))
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets,
+                     "itemsize": struct.calcsize(fmt)})
+
+
+class ColumnarFile:
+    def __init__(self, *datafiles, record=Record, rows=None):
+        self.record = record
+        self.dtype = record_dtype(record.FORMAT)
+        self.segments = []
+        for datafile in datafiles:
+            size = os.path.getsize(datafile) // self.dtype.itemsize
+            if size == 0:
+                continue
+            array = np.memmap(datafile, dtype=self.dtype, mode="r", shape=(size,))
+            if rows is not None:
+                array = array[np.asarray(rows, dtype=np.int64)]
+            live = array["active"] != 0 if "active" in self.dtype.names else None
+            self.segments.append((array, live))
+
+    @classmethod
+    def from_sequential(cls, sequential_file):
+        if sequential_file.codec.name != 'fixed':
+            raise ValueError("ColumnarFile solo lee archivos con el formato fijo de Record")
+        sequential_file.flush()
+        return cls(sequential_file.datafile, sequential_file.auxdata)
+
+    @classmethod
+    def from_avl(cls, avl):
+        if avl.codec.name != "fixed":
+            raise ValueError("ColumnarFile solo lee archivos con el formato fijo de Record")
+        # El datafile del AVL conserva registros eliminados: solo se toman los del índice
+        avl.flush()
+        rows = avl.range_search(avl.index_file, float("-inf"), float("inf"))
+        return cls(avl.datafile, record=AVLRecord, rows=rows)
+
+    def _mask(self, array, live, conditions):
+        mask = live.copy() if live is not None else np.ones(len(array), dtype=bool)
+        for field, value in conditions.items():
+            column = array[field]
+            if isinstance(value, tuple):
+                low, high = value
+                if low is not None:
+                    mask &= column >= (low.encode() if isinstance(low, str) else low)
+                if high is not None:
+                    mask &= column <= (high.encode() if isinstance(high, str) else high)
+            else:
+                mask &= column == (value.encode() if isinstance(value, str) else value)
+        return mask
+
+    def count(self, **conditions):
+        return sum(int(np.count_nonzero(self._mask(array, live, conditions)))
+                   for array, live in self.segments)
+
+    def column(self, name, **conditions):
+        parts = [array[name][self._mask(array, live, conditions)] for array, live in self.segments]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self.dtype[name])
+
+    def filter(self, **conditions):
+        records = []
+        for array, live in self.segments:
+            for row in array[self._mask(array, live, conditions)]:
+                records.append(self.record.unpack(row.tobytes()))
+        return records
@@ -0,0 +1,36 @@
+import sys
+import threading
+import traceback
+
+class Compactor:
+    # Hilo que reescribe el archivo secuencial cuando se lo avisan y se superó algún umbral
+    def __init__(self, sf):
+        self.sf = sf
+        self.event = threading.Event()
+        self.stopped = False
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='compactor', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            self.event.wait()
+            self.event.clear()
+            if self.stopped:
+                return
+            try:
+                if self.sf.needs_compaction():
+                    self.sf.rebuild()
+            except Exception as exc:
+                # Un rebuild fallido (disco lleno, error de E/S) se informa y el hilo sigue esperando avisos
+                self.error = exc
+                print(f'Error en la compactación de {self.sf.datafile}:', file=sys.stderr)
+                traceback.print_exc()
+
+    def notify(self):
+        self.event.set()
+
+    def stop(self):
+        self.stopped = True
+        self.event.set()
+        self.thread.join()
@@ -0,0 +1,9 @@
+import pandas as pd
+
+COLUMNS = ["Employee_ID", "Employee_Name", "Age", "Country", "Department", "Position", "Salary", "Joining_Date"]
+
+
+def read_rows(file, sep=",", chunksize=50000):
+    # Lee el CSV por bloques y entrega (employee_id, nombre, edad, país, departamento, cargo, salario, fecha)
+    for chunk in pd.read_csv(file, sep=sep, chunksize=chunksize):
+        yield from zip(*(chunk[column].tolist() for column in COLUMNS))
@@ -0,0 +1,61 @@
+import os
+import mmap
+import struct
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+# Mínimo de registros por tarea: por debajo el costo de enviar resultados entre procesos domina
+MIN_TASK_RECORDS = 10000
+
+
+def _decode(fields):
+    return tuple(value.decode().rstrip('\x00') if isinstance(value, bytes) else value for value in fields)
+
+
+def _scan_chunk(path, fmt, start, stop, active):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        data = buf[start:stop]
+    return [_decode(fields) for fields in struct.iter_unpack(fmt, data) if not active or fields[-1]]
+
+
+def _read_chunk(path, fmt, positions):
+    unpack_from = struct.Struct(fmt).unpack_from
+    size = struct.calcsize(fmt)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        return [_decode(unpack_from(buf, pos * size)) for pos in positions]
+
+
+def _tasks(count, workers):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return 1
+    return max(1, min(workers * 4, count // MIN_TASK_RECORDS))
+
+
+def _run(fn, tasks, executor, workers):
+    if len(tasks) == 1:
+        return fn(*tasks[0])
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(itertools.chain.from_iterable(executor.map(fn, *zip(*tasks))))
+    return list(itertools.chain.from_iterable(executor.map(fn, *zip(*tasks))))
+
+
+def scan_range(path, fmt, start, stop, active=False, executor=None, workers=None):
+    # Divide [start, stop) en rangos alineados al tamaño del registro; el orden del archivo se conserva
+    size = struct.calcsize(fmt)
+    count = (stop - start) // size
+    if count <= 0:
+        return []
+    step = -(-count // _tasks(count, workers))
+    tasks = [(path, fmt, start + i * size, start + min(i + step, count) * size, active)
+             for i in range(0, count, step)]
+    return _run(_scan_chunk, tasks, executor, workers)
+
+
+def read_positions(path, fmt, positions, executor=None, workers=None):
+    if not positions:
+        return []
+    step = -(-len(positions) // _tasks(len(positions), workers))
+    tasks = [(path, fmt, positions[i:i + step]) for i in range(0, len(positions), step)]
+    return _run(_read_chunk, tasks, executor, workers)
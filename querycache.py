@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+class QueryCache:
+    # Tamaño aproximado en memoria de un Record ya decodificado
+    RECORD_BYTES = 512
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.ranges = set()
+        self.bytes = 0
+        # Cada invalidación cambia la generación: un resultado calculado antes no se guarda
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / requests if requests else 0.0,
+                    "evictions": self.evictions, "invalidations": self.invalidations,
+                    "entries": len(self.entries), "bytes": self.bytes}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return True, entry[0]
+
+    def put(self, key, value, generation):
+        count = len(value) if isinstance(value, list) else 1
+        size = max(count, 1) * self.RECORD_BYTES
+        with self.lock:
+            if generation != self.generation or size > self.max_bytes:
+                return
+            self._drop(key)
+            self.entries[key] = (value, size)
+            self.bytes += size
+            if key[0] == "range":
+                self.ranges.add(key)
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, stats=None):
+        # La generación se lee antes de consultar: si hubo una escritura mientras tanto el resultado no se guarda
+        generation = self.generation
+        hit, value = self.get(key)
+        if stats:
+            stats.add("cache_hits" if hit else "cache_misses")
+        if not hit:
+            value = compute()
+            self.put(key, value, generation)
+        return value
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+            self.ranges.discard(key)
+
+    def invalidate(self, keys):
+        # Descarta la búsqueda puntual de cada clave y los rangos que la contienen
+        keys = list(keys)
+        with self.lock:
+            self.generation += 1
+            if len(keys) > len(self.entries):
+                self._clear()
+                return
+            for key in keys:
+                if ("point", key) in self.entries:
+                    self._drop(("point", key))
+                    self.invalidations += 1
+                for range_key in [range_key for range_key in self.ranges if range_key[1] <= key <= range_key[2]]:
+                    self._drop(range_key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self._clear()
+
+    def _clear(self):
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.ranges.clear()
+        self.bytes = 0
@@ -0,0 +1,95 @@
+import bisect
+
+HASH_FIELDS = ("country", "department", "position")
+ORDERED_FIELDS = ("salary", "age")
+
+
+class HashIndex:
+    def __init__(self, field):
+        self.field = field
+        self.buckets = {}
+
+    def add(self, record):
+        self.buckets.setdefault(getattr(record, self.field), set()).add(record.employee_id)
+
+    def discard(self, record):
+        bucket = self.buckets.get(getattr(record, self.field))
+        if bucket is not None:
+            bucket.discard(record.employee_id)
+            if not bucket:
+                del self.buckets[getattr(record, self.field)]
+
+    def find(self, value):
+        return sorted(self.buckets.get(value, ()))
+
+
+class OrderedIndex:
+    def __init__(self, field):
+        self.field = field
+        self.entries = []
+
+    def add(self, record):
+        bisect.insort(self.entries, (getattr(record, self.field), record.employee_id))
+
+    def discard(self, record):
+        entry = (getattr(record, self.field), record.employee_id)
+        pos = bisect.bisect_left(self.entries, entry)
+        if pos < len(self.entries) and self.entries[pos] == entry:
+            del self.entries[pos]
+
+    def find(self, low, high):
+        start = bisect.bisect_left(self.entries, (low, float("-inf")))
+        end = bisect.bisect_right(self.entries, (high, float("inf")))
+        return [employee_id for _, employee_id in self.entries[start:end]]
+
+
+class SecondaryIndexes:
+    def __init__(self):
+        self.indexes = {}
+
+    def __bool__(self):
+        return bool(self.indexes)
+
+    def create(self, field, records):
+        if field in HASH_FIELDS:
+            index = HashIndex(field)
+        elif field in ORDERED_FIELDS:
+            index = OrderedIndex(field)
+        else:
+            raise ValueError(f"No se puede indexar el campo {field}")
+        entries = [(getattr(record, field), record.employee_id) for record in records]
+        if isinstance(index, OrderedIndex):
+            entries.sort()
+            index.entries = entries
+        else:
+            for value, employee_id in entries:
+                index.buckets.setdefault(value, set()).add(employee_id)
+        self.indexes[field] = index
+
+    def add(self, record):
+        for index in self.indexes.values():
+            index.add(record)
+
+    def discard(self, record):
+        for index in self.indexes.values():
+            index.discard(record)
+
+    def _index(self, field):
+        # Los índices viven solo en memoria: no se guardan con el archivo ni sobreviven a un reinicio
+        index = self.indexes.get(field)
+        if index is None:
+            raise ValueError(f"No hay índice secundario sobre {field}; llamar a create_index('{field}') "
+                             f"después de abrir el archivo")
+        return index
+
+    def find(self, field, value):
+        index = self._index(field)
+        if isinstance(index, OrderedIndex):
+            return index.find(value, value)
+        return index.find(value)
+
+    def range(self, field, low, high):
+        index = self._index(field)
+        if not isinstance(index, OrderedIndex):
+            raise ValueError(f"El índice sobre {field} es hash: solo admite find_by")
+        return index.find(low, high)
@@ -0,0 +1,73 @@
+import time
+import threading
+import functools
+from collections import Counter
+
+
+class Histogram:
+    # Buckets de potencias de 2 en microsegundos: el bucket i cuenta latencias <= 2**i us
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.buckets[int(seconds * 1e6).bit_length()] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, fraction):
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= fraction * self.count:
+                return 1 << bucket
+        return None
+
+    def snapshot(self):
+        return {"count": self.count, "total_s": self.total,
+                "p50_us": self.percentile(0.50), "p99_us": self.percentile(0.99),
+                "buckets_us": {1 << bucket: count for bucket, count in sorted(self.buckets.items())}}
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = Counter()
+            self.latency = {}
+
+    def add(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe(self, operation, seconds):
+        with self.lock:
+            histogram = self.latency.get(operation)
+            if histogram is None:
+                histogram = self.latency[operation] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {"counters": dict(self.counters),
+                    "latency": {operation: histogram.snapshot() for operation, histogram in self.latency.items()}}
+
+
+def timed(operation):
+    # Registra la latencia del método solo si la instancia tiene stats activado
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.stats:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.stats.observe(operation, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+import os
+import zlib
+import struct
+
+INSERT = b"I"
+REMOVE = b"R"
+BULK = b"B"
+CHECKPOINT = b"C"
+
+
+def fsync_dir(path):
+    # Hace durable un os.replace dentro del directorio del archivo
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WAL:
+    # Cada entrada: longitud y CRC32 del contenido, seguidos de la operación (1 byte) y sus datos
+    FRAME = struct.Struct("<II")
+
+    def __init__(self, path, group_commit=1, checkpoint_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.group_commit = group_commit
+        self.checkpoint_bytes = checkpoint_bytes
+        self.pending = 0
+        self.dirty = False
+        if not os.path.exists(self.path):
+            with open(self.path, "wb") as f:
+                f.write(b"")
+        self.file = open(self.path, "r+b")
+
+    def _frame(self, op, payload):
+        body = op + payload
+        return self.FRAME.pack(len(body), zlib.crc32(body)) + body
+
+    def replay(self):
+        # Devuelve el último checkpoint y las operaciones posteriores; una cola incompleta se descarta
+        self.file.seek(0)
+        data = self.file.read()
+        checkpoint = None
+        entries = []
+        pos = 0
+        while pos + self.FRAME.size <= len(data):
+            length, crc = self.FRAME.unpack_from(data, pos)
+            body = data[pos + self.FRAME.size:pos + self.FRAME.size + length]
+            if length == 0 or len(body) < length or zlib.crc32(body) != crc:
+                break
+            if body[:1] == CHECKPOINT:
+                checkpoint = body[1:]
+                entries = []
+            else:
+                entries.append((body[:1], body[1:]))
+            pos += self.FRAME.size + length
+        if pos < len(data):
+            self.file.truncate(pos)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.file.seek(0, 2)
+        self.dirty = bool(entries)
+        return checkpoint, entries
+
+    def append(self, op, payload):
+        self.append_many(op, [payload])
+
+    def append_many(self, op, payloads):
+        self.file.write(b"".join(self._frame(op, payload) for payload in payloads))
+        self.pending += len(payloads)
+        # La primera entrada después de un checkpoint se baja a disco de inmediato: marca el log como sucio
+        if not self.dirty or self.pending >= self.group_commit:
+            self.commit()
+        self.dirty = True
+
+    def commit(self):
+        if not self.pending:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def size(self):
+        return self.file.tell()
+
+    def checkpoint(self, payload):
+        # El log nuevo solo contiene el checkpoint y reemplaza al anterior de forma atómica
+        tmpfile = self.path + ".tmp"
+        with open(tmpfile, "wb") as f:
+            f.write(self._frame(CHECKPOINT, payload))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmpfile, self.path)
+        fsync_dir(self.path)
+        self.file.close()
+        self.file = open(self.path, "r+b")
+        self.file.seek(0, 2)
+        self.pending = 0
+        self.dirty = False
+
+    def close(self):
+        if not self.file.closed:
+            self.commit()
+            self.file.close()